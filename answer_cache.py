@@ -0,0 +1,140 @@
+import random
+import re
+import threading
+import zlib
+from collections import OrderedDict
+
+
+# Large prime for the universal hash family used by MinHash
+_PRIME = (1 << 61) - 1
+
+
+# Words that change how a question is worded but not what it asks. Question words,
+# modal verbs and negations are left in: "why" and "how" ask different things.
+STOPWORDS = frozenset("""
+    a an the is are was were be been being am do does did i me my you your we us our it its
+    this that these those there of in on at to for with by from as into about and or so please
+""".split())
+
+
+# The words of a question that say what it is about, in order
+def content_words(text):
+    words = []
+    for word in re.findall(r"[a-z0-9]+(?:'[a-z]+)?", text.lower().replace("\u2019", "'")):
+        word = word.removesuffix("'s")
+        if word in STOPWORDS:
+            continue
+        # Fold plurals so "lists" and "list" are the same word
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        words.append(word)
+    return words
+
+
+# The unigrams out of a set of shingles
+def words(question_shingles):
+    return {shingle for shingle in question_shingles if " " not in shingle}
+
+
+# Break a question into the unigrams and bigrams of its content words
+def shingles(text):
+    words = content_words(text)
+    return set(words) | {f"{a} {b}" for a, b in zip(words, words[1:])}
+
+
+# In-memory cache of explanations that also answers questions worded slightly
+# differently from one already asked. Questions are compared within a scope
+# (subject, module, level, style) by the Jaccard similarity of their shingles;
+# MinHash signatures bucketed with LSH find the candidates without a full scan.
+# A match must also use the same content words, so questions that differ in what
+# they ask about ("a list and a set" vs "a list and a tuple") never share an answer
+# however similar the rest of their wording is.
+class AnswerCache:
+    def __init__(self, threshold=0.85, max_entries=2000, num_perm=64, bands=32):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.hits = 0
+        self.misses = 0
+        # Random coefficients make each permutation independent of the others; a fixed
+        # seed keeps signatures the same from one run to the next
+        rng = random.Random(num_perm)
+        self._coefficients = [(rng.randrange(1, _PRIME), rng.randrange(_PRIME)) for _ in range(num_perm)]
+        self._entries = OrderedDict()  # entry id -> (scope, shingles, band keys, answer)
+        self._buckets = {}             # (scope, band, band values) -> set of entry ids
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def _signature(self, question_shingles):
+        hashes = [zlib.crc32(shingle.encode("utf-8")) for shingle in question_shingles]
+        return [min((a * h + b) % _PRIME for h in hashes) for a, b in self._coefficients]
+
+    def _band_keys(self, scope, question_shingles):
+        signature = self._signature(question_shingles)
+        return [
+            (scope, band, tuple(signature[band * self.rows:(band + 1) * self.rows]))
+            for band in range(self.bands)
+        ]
+
+    def get(self, scope, question):
+        question_shingles = shingles(question)
+        if not question_shingles:
+            return None
+        band_keys = self._band_keys(scope, question_shingles)
+
+        with self._lock:
+            candidates = set()
+            for key in band_keys:
+                candidates.update(self._buckets.get(key, ()))
+
+            # Confirm candidates with their exact similarity, keeping the closest one
+            best_id, best_score = None, self.threshold
+            question_words = words(question_shingles)
+            for entry_id in candidates:
+                entry_shingles = self._entries[entry_id][1]
+                if words(entry_shingles) != question_words:
+                    continue
+                score = len(question_shingles & entry_shingles) / len(question_shingles | entry_shingles)
+                if score >= best_score:
+                    best_id, best_score = entry_id, score
+
+            if best_id is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._entries.move_to_end(best_id)
+            return self._entries[best_id][3]
+
+    def put(self, scope, question, answer):
+        question_shingles = shingles(question)
+        if not question_shingles:
+            return
+        band_keys = self._band_keys(scope, question_shingles)
+
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (scope, question_shingles, band_keys, answer)
+            for key in band_keys:
+                self._buckets.setdefault(key, set()).add(entry_id)
+
+            # Evict least recently used answers once the cache is full
+            while len(self._entries) > self.max_entries:
+                old_id, (_, _, old_keys, _) = self._entries.popitem(last=False)
+                for key in old_keys:
+                    bucket = self._buckets[key]
+                    bucket.discard(old_id)
+                    if not bucket:
+                        del self._buckets[key]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+            }
@@ -1,52 +1,95 @@
 import streamlit as st
-try:
-    import google.generativeai as genai
-except ImportError:
-    st.error("Failed to import google-generativeai. Please make sure it's installed.")
-    st.stop()
-import json
+import asyncio
+import concurrent.futures
 import os
+import re
+import secrets
+import threading
 import time
-import random
-from datetime import datetime
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
-
-# Get API key from environment
-api_key = os.getenv("GEMINI_API_KEY")
+from startup import startup_profile
 
 # Page configuration
 st.set_page_config(page_title="AI Learning Assistant", layout="wide")
 
-# Application title and introduction
+# Application title and introduction, shown before anything slow runs
 st.title("🧠 Personalized Learning Assistant")
 st.markdown("""
 This application helps you master new subjects with personalized learning paths,
 adaptive exercises, and AI-powered explanations tailored to your learning style.
 """)
 
+# Set STARTUP_PROFILE=1 to log how long each startup step takes on the first run
+run_started = time.perf_counter()
+
+with startup_profile.step("import python-dotenv"):
+    from dotenv import dotenv_values, find_dotenv
+with startup_profile.step("import core (store, caches, scheduler, parsers)"):
+    from core import LearningCore, create_scheduled_model
+    from metrics import registry, start_file_exporter, start_http_exporter
+
+# Names of the environment variables set before the .env file was first read
+@st.cache_resource(show_spinner=False)
+def process_environment():
+    return frozenset(os.environ)
+
+# Load environment variables, re-reading the .env file only when it changes. Values
+# from an earlier read are replaced, so e.g. a rotated API key takes effect, but
+# variables set outside the file still win over it.
+@st.cache_resource(show_spinner=False)
+def load_environment(env_file, modified):
+    for name, value in dotenv_values(env_file).items():
+        if value is not None and name not in process_environment():
+            os.environ[name] = value
+
+with startup_profile.step("load .env"):
+    env_file = find_dotenv()
+    process_environment()
+    load_environment(env_file, os.path.getmtime(env_file) if env_file else None)
+
+# Get API key from environment
+api_key = os.getenv("GEMINI_API_KEY")
+
+# Name a learner has until they give their own; learners keeping it are not saved
+DEFAULT_USER_NAME = "Learner"
+
+# Saved learners are stored under a random id carried in the page address as ?learner=...
+LEARNER_PARAM = "learner"
+LEARNER_ID = re.compile(r"[A-Za-z0-9_-]{22}")
+
 # Initialize session state for storing conversation and learning path
 if 'initialized' not in st.session_state:
     st.session_state.conversations = {}
+    st.session_state.question_banks = {}
+    st.session_state.practice_result = None
     st.session_state.learning_paths = {}
+    st.session_state.path_cache_keys = {}
+    st.session_state.path_overviews = {}
     st.session_state.current_subject = None
     st.session_state.current_module = None
     st.session_state.quiz_active = False
     st.session_state.quiz_questions = []
     st.session_state.quiz_responses = []
+    st.session_state.quiz_batched = True
+    st.session_state.quiz_score_saved = False
     st.session_state.progress = {}
     st.session_state.knowledge_level = "Beginner"  # Initialize with default value
     st.session_state.learning_style = "Visual"     # Initialize with default value
-    st.session_state.user_name = "Learner"         # Initialize with default value
+    st.session_state.user_name = DEFAULT_USER_NAME # Initialize with default value
+    st.session_state.render_timings = {}           # Latest render time of each panel, read by the benchmarks
     st.session_state.initialized = True
 
-# Sidebar for user profile (API key is now loaded from environment)
-with st.sidebar:
+# User profile, rerun on its own when the learning style or knowledge level changes
+@st.fragment
+def profile_panel():
+    started = time.perf_counter()
     st.header("User Profile")
-    user_name = st.text_input("Your Name", value=st.session_state.user_name)
-    st.session_state.user_name = user_name
+    user_name = st.text_input("Your Name", value=st.session_state.user_name,
+                              help="Give your name to save your learning paths and progress. "
+                                   "Come back to this page's address to pick them up again.")
+    if user_name != st.session_state.user_name:
+        st.session_state.user_name = user_name
+        # Saving the learner needs the core, which the rest of the script sets up
+        st.rerun()
     
     # Learning style selection
     st.subheader("Learning Style")
@@ -64,6 +107,11 @@ with st.sidebar:
         value=st.session_state.knowledge_level
     )
     st.session_state.knowledge_level = knowledge_level
+    st.session_state.render_timings["Profile"] = time.perf_counter() - started
+
+# Sidebar for user profile (API key is now loaded from environment)
+with st.sidebar:
+    profile_panel()
 
     # Add a separator
     st.markdown("---")
@@ -98,20 +146,35 @@ with st.sidebar:
             unsafe_allow_html=True
         )
 
+# Shared model, created once per server process and reused by every session and rerun.
+# It is only rebuilt when the backend or API key changes, and all sessions share its
+# client and the kept-alive connection behind it.
+@st.cache_resource(show_spinner=False)
+def get_model(backend, api_key):
+    return create_scheduled_model(backend, api_key)
+
+# Export model call metrics in Prometheus format when METRICS_PORT or METRICS_FILE is set
+@st.cache_resource(show_spinner=False)
+def start_metrics_exporters():
+    if os.getenv("METRICS_PORT"):
+        start_http_exporter(registry, int(os.getenv("METRICS_PORT")), os.getenv("METRICS_HOST", "127.0.0.1"))
+    if os.getenv("METRICS_FILE"):
+        start_file_exporter(registry, os.getenv("METRICS_FILE"))
+
+with startup_profile.step("start metrics exporters"):
+    start_metrics_exporters()
+
+# Set MODEL_BACKEND=fake to run against the offline fake model instead of Gemini
+model_backend = os.getenv("MODEL_BACKEND", "gemini")
+
 # Initialize Gemini API with the key from environment
-if api_key:
+model = None
+if api_key or model_backend != "gemini":
     try:
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel(
-            model_name="gemini-2.0-flash",
-            generation_config={
-                "temperature": 0.7,
-                "top_p": 0.95,
-                "top_k": 40,
-                "max_output_tokens": 8192,
-            }
-        )
-        st.session_state.model = model
+        # The client library is imported by the first model call, or in the background
+        # once this page is out (see the end of this script)
+        with startup_profile.step("create model scheduler"):
+            model = get_model(model_backend, api_key)
         
         if 'model_initialized' not in st.session_state:
             st.success("API configured successfully from environment variable!")
@@ -121,243 +184,140 @@ if api_key:
 else:
     st.warning("GEMINI_API_KEY not found in environment variables. Please add it to your .env file.")
 
-# Function to create a new learning path with improved JSON handling
-def create_learning_path(subject):
-    if 'model' not in st.session_state:
-        return None
-    
-    prompt = f"""
-    Create a comprehensive learning path for teaching {subject} to a {st.session_state.knowledge_level.lower()} level student 
-    who prefers {st.session_state.learning_style} learning style. The user's name is {st.session_state.user_name}.
-    
-    Format the output as a valid JSON object with the following structure:
-    {{
-        "subject": "{subject}",
-        "overview": "Brief overview of what they will learn",
-        "modules": [
-            {{
-                "id": 1,
-                "title": "Module title",
-                "description": "Short description",
-                "content": "Detailed learning content formatted for {st.session_state.learning_style} learners",
-                "exercises": [
-                    {{
-                        "question": "Practice question",
-                        "options": ["Option A", "Option B", "Option C", "Option D"],
-                        "answer": "Correct option",
-                        "explanation": "Detailed explanation of the answer"
-                    }}
-                ],
-                "additional_resources": ["Resource 1", "Resource 2"]
-            }}
-        ]
-    }}
-    
-    Include 5-7 modules with gradually increasing complexity, and 3-5 exercises per module.
-    Ensure content is adapted to {st.session_state.learning_style} learning style by including appropriate examples and explanations.
-    
-    IMPORTANT: Make sure the JSON is properly formatted with no syntax errors. Use double quotes for all strings and keys, and ensure all quotes and brackets are properly closed.
-    """
-    
-    try:
-        response = st.session_state.model.generate_content(prompt)
-        content = response.text
-        
-        # Extract JSON from the response
-        json_str = content
-        if "```json" in content:
-            json_str = content.split("```json")[1].split("```")[0].strip()
-        elif "```" in content:
-            json_str = content.split("```")[1].split("```")[0].strip()
-        
-        # Log the JSON string for debugging
-        st.write("Parsing JSON...")
-        
-        try:
-            # Try to parse the JSON
-            learning_path = json.loads(json_str)
-            st.session_state.learning_paths[subject] = learning_path
-            st.session_state.current_subject = subject
-            st.session_state.progress[subject] = {
-                "started": datetime.now().strftime("%Y-%m-%d"),
-                "modules_completed": [],
-                "current_module": 0,
-                "quiz_scores": []
-            }
-            return learning_path
-        except json.JSONDecodeError as je:
-            st.error(f"JSON parsing error: {je}")
-            st.write("Attempting to fix JSON format...")
-            
-            # Attempt to fix common JSON errors
-            fixed_json_str = json_str.replace('\n', ' ').replace('\r', '')
-            fixed_json_str = fixed_json_str.replace('\\', '\\\\')
-            
-            # Ensure all quotes are properly escaped
-            quote_positions = []
-            in_quote = False
-            for i, char in enumerate(fixed_json_str):
-                if char == '"' and (i == 0 or fixed_json_str[i-1] != '\\'):
-                    in_quote = not in_quote
-                    quote_positions.append(i)
-            
-            try:
-                learning_path = json.loads(fixed_json_str)
-                st.success("JSON fixed successfully!")
-                st.session_state.learning_paths[subject] = learning_path
-                st.session_state.current_subject = subject
-                st.session_state.progress[subject] = {
-                    "started": datetime.now().strftime("%Y-%m-%d"),
-                    "modules_completed": [],
-                    "current_module": 0,
-                    "quiz_scores": []
-                }
-                return learning_path
-            except:
-                # As a last resort, try using a different prompt for simpler JSON
-                st.warning("Trying alternative approach...")
-                return create_simpler_learning_path(subject)
-    except Exception as e:
-        st.error(f"Error creating learning path: {e}")
-        return None
+# Caches, store and background pools shared by every session, one set per server process
+@st.cache_resource
+def get_core():
+    return LearningCore.from_env()
 
-# Fallback function for creating a simpler learning path
-def create_simpler_learning_path(subject):
-    if 'model' not in st.session_state:
-        return None
-    
-    prompt = f"""
-    Create a simple learning path for {subject} at {st.session_state.knowledge_level.lower()} level.
-    
-    Return ONLY a valid JSON object with this exact structure:
-    {{
-        "subject": "subject name",
-        "overview": "brief overview",
-        "modules": [
-            {{
-                "id": 1,
-                "title": "title1",
-                "description": "description1",
-                "content": "content1",
-                "exercises": [
-                    {{
-                        "question": "question1",
-                        "options": ["opt1", "opt2", "opt3", "opt4"],
-                        "answer": "opt1",
-                        "explanation": "explanation1"
-                    }}
-                ],
-                "additional_resources": ["res1", "res2"]
-            }}
-        ]
-    }}
-    
-    Include 3 modules with 2 exercises each. No markdown formatting in your response.
-    """
-    
-    try:
-        response = st.session_state.model.generate_content(prompt)
-        content = response.text
-        
-        # Extract JSON
-        if "```json" in content:
-            json_str = content.split("```json")[1].split("```")[0].strip()
-        elif "```" in content:
-            json_str = content.split("```")[1].split("```")[0].strip()
-        else:
-            json_str = content.strip()
-        
-        learning_path = json.loads(json_str)
-        st.session_state.learning_paths[subject] = learning_path
-        st.session_state.current_subject = subject
-        st.session_state.progress[subject] = {
-            "started": datetime.now().strftime("%Y-%m-%d"),
-            "modules_completed": [],
-            "current_module": 0,
-            "quiz_scores": []
-        }
-        return learning_path
-    except Exception as e:
-        st.error(f"Could not create learning path: {e}")
-        return None
+# The learning logic lives in core.py; this run uses it with the model configured above.
+# Learner state is kept in st.session_state, which has the attributes core expects.
+with startup_profile.step("open store and caches"):
+    core = get_core().with_model(model)
 
-# Function to generate AI response for questions
-def get_ai_explanation(question, subject, module):
-    if 'model' not in st.session_state:
-        return "Please configure the API key first."
-    
-    prompt = f"""
-    The user {st.session_state.user_name} is learning about {subject}, specifically in the module: {module}.
-    They have a {st.session_state.knowledge_level.lower()} knowledge level and prefer {st.session_state.learning_style} learning style.
-    
-    Their question is: "{question}"
-    
-    Please provide a helpful, detailed explanation that:
-    1. Directly answers their question
-    2. Uses examples and explanations suitable for {st.session_state.learning_style} learners
-    3. Connects to the broader context of {subject}
-    4. Is appropriate for someone at {st.session_state.knowledge_level.lower()} level
-    """
-    
-    try:
-        response = st.session_state.model.generate_content(prompt)
-        return response.text
-    except Exception as e:
-        return f"Error generating explanation: {e}"
+# Load the learner's saved paths when the session starts. Learners are saved under a
+# random id from the page address rather than their name, so nobody can open another
+# learner's paths by typing that learner's name. A learner without an id is kept in
+# memory only, until they give a name of their own.
+if "learner_id" not in st.session_state:
+    learner_id = st.query_params.get(LEARNER_PARAM, "")
+    st.session_state.learner_id = learner_id if LEARNER_ID.fullmatch(learner_id) else None
+    if st.session_state.learner_id:
+        st.session_state.user_name = core.store.display_name(learner_id) or DEFAULT_USER_NAME
+    st.session_state.saved_name = st.session_state.user_name
+    with startup_profile.step("load learner"):
+        core.load_learner(st.session_state)
+    # The profile was drawn before the learner's name was known
+    if st.session_state.user_name != DEFAULT_USER_NAME:
+        st.rerun()
 
-# Function to evaluate quiz answers
-def evaluate_quiz_answer(user_answer, correct_answer, question, subject, module):
-    if 'model' not in st.session_state:
-        return "Please configure the API key first."
-    
-    prompt = f"""
-    Evaluate the user's answer to the following question about {subject} from module "{module}".
-    
-    Question: {question}
-    Correct answer: {correct_answer}
-    User's answer: {user_answer}
-    
-    Provide:
-    1. Whether the answer is correct, partially correct, or incorrect
-    2. A detailed explanation of why
-    3. Additional insights or tips to help the user understand better
-    4. Explain any misconceptions if present
-    
-    Remember the user is at {st.session_state.knowledge_level.lower()} level and prefers {st.session_state.learning_style} learning style.
-    """
+# Giving a name starts saving the learner, with what they have done so far, under a new id
+if st.session_state.user_name != st.session_state.saved_name:
+    if st.session_state.learner_id is None and st.session_state.user_name.strip() not in ("", DEFAULT_USER_NAME):
+        learner_id = secrets.token_urlsafe(16)
+        st.query_params[LEARNER_PARAM] = learner_id
+        core.start_saving(st.session_state, learner_id)
+    if st.session_state.learner_id:
+        core.store.save_display_name(st.session_state.learner_id, st.session_state.user_name)
+    st.session_state.saved_name = st.session_state.user_name
+
+# Background event loop shared by all sessions for concurrent model calls, with a
+# semaphore bounding how many async requests are in flight at once
+@st.cache_resource
+def get_async_runner():
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="model-async", daemon=True).start()
+    return loop, asyncio.Semaphore(int(os.getenv("MODEL_ASYNC_CONCURRENCY", "10")))
+
+async def bounded(semaphore, coroutine):
+    async with semaphore:
+        return await coroutine
+
+# Function to start evaluating quiz answers concurrently in the background.
+# Returns a dict of future -> response; each future's result is that response's evaluation.
+def submit_answer_evaluations(pending, subject, module):
+    if model is None:
+        for response in pending:
+            response["evaluation"] = "Please configure the API key first."
+        return {}
     
-    try:
-        response = st.session_state.model.generate_content(prompt)
-        return response.text
-    except Exception as e:
-        return f"Error evaluating answer: {e}"
+    # Prompts are built here since session state is only available on the script thread
+    loop, semaphore = get_async_runner()
+    futures = {}
+    for response in pending:
+        coroutine = core.evaluate_quiz_answer_async(
+            st.session_state,
+            response["user_answer"],
+            response["correct_answer"],
+            response["question"],
+            subject,
+            module
+        )
+        futures[asyncio.run_coroutine_threadsafe(bounded(semaphore, coroutine), loop)] = response
+    return futures
 
-# Function to mark a module as complete
-def complete_module(subject, module_id):
-    if subject in st.session_state.progress:
-        if module_id not in st.session_state.progress[subject]["modules_completed"]:
-            st.session_state.progress[subject]["modules_completed"].append(module_id)
-        
-        # Set the next module as current
-        next_module = module_id + 1
-        if next_module <= len(st.session_state.learning_paths[subject]["modules"]):
-            st.session_state.progress[subject]["current_module"] = next_module
-        else:
-            st.session_state.progress[subject]["current_module"] = module_id
+# Function to make sure a module has its content, showing a spinner while it is generated
+def load_module(subject, module):
+    if module.content is None:
+        with st.spinner("Preparing module content..."):
+            core.load_module(st.session_state, subject, module)
+    else:
+        core.load_module(st.session_state, subject, module)
 
-# Main content area
+# Main content area. Each panel is a function; the Study, Practice and profile panels
+# are fragments, so interacting with one of them reruns only that panel and not the
+# whole script. Changes other panels depend on (a new path, a finished module, a
+# closed quiz) trigger a full rerun instead.
 tab1, tab2, tab3, tab4 = st.tabs(["Learning Path", "Study Module", "Practice", "Progress"])
 
+# Function to record how long a panel took to render on its latest run, read by the benchmarks
+def record_render_time(panel, started):
+    st.session_state.render_timings[panel] = time.perf_counter() - started
+
+# Function to let the learner pick a module of the current path, defaulting to their current one
+def select_module(path, label, key=None):
+    module_ids = [m.id for m in path.modules]
+    module_id = min(st.session_state.current_module, len(module_ids))
+    selected_id = st.selectbox(
+        label,
+        module_ids,
+        index=module_id - 1,
+        format_func=lambda module_id: path.module(module_id).label,
+        key=key
+    )
+    return path.module(selected_id)
+
 # Tab 1: Learning Path Creation
-with tab1:
+def learning_path_panel():
+    started = time.perf_counter()
     st.header("Create Your Learning Journey")
     
     new_subject = st.text_input("What subject would you like to learn?")
+    stream_path = st.checkbox("Show modules as they are generated", value=True)
+    outline_first = st.checkbox("Generate module content only when I open a module (faster start)")
     
-    if st.button("Create Learning Path", disabled='model' not in st.session_state):
+    if st.button("Create Learning Path", disabled=model is None):
         if new_subject:
+            preview = st.container()
+            
+            # Render the overview and each module as soon as the model finishes it
+            def on_update(field, value):
+                if field == "overview":
+                    preview.info(value)
+                else:
+                    with preview.expander(f"Module {value.get('id')}: {value.get('title', '')}"):
+                        st.write(value.get("description", ""))
+                        st.markdown(value.get("content") or "")
+            
+            updates = on_update if stream_path else None
             with st.spinner(f"Creating personalized learning path for {new_subject}..."):
-                learning_path = create_learning_path(new_subject)
+                try:
+                    if outline_first:
+                        learning_path = core.create_learning_path_outline(st.session_state, new_subject, updates)
+                    else:
+                        learning_path = core.create_learning_path(st.session_state, new_subject, updates, notify=st.warning)
+                except Exception as e:
+                    st.error(f"Error creating learning path: {e}")
+                    learning_path = None
                 if learning_path:
                     st.success(f"Learning path for {new_subject} created successfully!")
                     st.session_state.current_module = 1
@@ -365,117 +325,184 @@ with tab1:
             st.warning("Please enter a subject to start learning")
     
     # Display available learning paths
-    if st.session_state.learning_paths:
+    if st.session_state.path_overviews:
         st.subheader("Your Learning Paths")
         cols = st.columns(3)
         
         i = 0
-        for subject, path in st.session_state.learning_paths.items():
+        for subject, overview in st.session_state.path_overviews.items():
             with cols[i % 3]:
                 st.info(f"📚 {subject}")
-                st.write(path["overview"])
+                st.write(overview)
                 if st.button(f"Study {subject}", key=f"study_{subject}"):
                     st.session_state.current_subject = subject
-                    if subject in st.session_state.progress:
-                        current_module = st.session_state.progress[subject]["current_module"]
+                    if core.load_learning_path(st.session_state, subject):
+                        current_module = st.session_state.progress[subject].current_module
                         st.session_state.current_module = current_module if current_module > 0 else 1
                     else:
                         st.session_state.current_module = 1
             i += 1
+    
+    record_render_time("Learning Path", started)
 
 # Tab 2: Study Module
-with tab2:
+@st.fragment
+def study_panel():
+    started = time.perf_counter()
     st.header("Study Module")
     
+    if st.session_state.get("study_notice"):
+        st.success(st.session_state.pop("study_notice"))
+    
     if st.session_state.current_subject and st.session_state.current_module:
         subject = st.session_state.current_subject
-        module_id = st.session_state.current_module
         
-        if subject in st.session_state.learning_paths:
-            path = st.session_state.learning_paths[subject]
-            
-            # Module selection
-            all_modules = [f"Module {m['id']}: {m['title']}" for m in path["modules"]]
-            selected_module = st.selectbox(
-                "Select module to study:", 
-                all_modules,
-                index=module_id-1
-            )
-            
-            # Extract module ID from selection
-            selected_id = int(selected_module.split(":")[0].replace("Module ", ""))
+        path = core.load_learning_path(st.session_state, subject)
+        if path:
+            module = select_module(path, "Select module to study:")
             
-            # Find the selected module
-            module = next((m for m in path["modules"] if m["id"] == selected_id), None)
+            # Outline paths generate a module's content the first time it is opened
+            try:
+                load_module(subject, module)
+            except Exception as e:
+                st.error(f"Error generating module content: {e}")
+                module = None
             
             if module:
-                st.subheader(f"{module['title']}")
-                st.write(module["description"])
+                st.subheader(f"{module.title}")
+                st.write(module.description)
                 
                 # Render module content
                 st.markdown("## Learning Content")
-                st.markdown(module["content"])
+                st.markdown(module.content)
                 
                 # Additional resources
-                if module.get("additional_resources"):
+                if module.additional_resources:
                     st.markdown("### Additional Resources")
-                    for resource in module["additional_resources"]:
+                    for resource in module.additional_resources:
                         st.markdown(f"- {resource}")
                 
                 # Mark as complete button
                 if st.button("Mark Module as Complete"):
-                    complete_module(subject, selected_id)
-                    st.success(f"Module {selected_id} marked as complete!")
-                    st.session_state.current_module = selected_id + 1
+                    core.complete_module(st.session_state, subject, module.id)
+                    st.session_state.current_module = module.id + 1
+                    st.session_state.study_notice = f"Module {module.id} marked as complete!"
+                    # The other panels show progress too, so rerun the whole app
+                    st.rerun()
                 
                 # Ask a question about this module
                 st.markdown("### Questions about this module?")
+                
+                # Recent answers in this module, kept for review; older ones are summarized
+                summary, turns = core.get_conversation(st.session_state, subject, module.id).context()
+                if summary:
+                    with st.expander("Earlier in this conversation"):
+                        st.markdown(summary)
+                for asked, answer in turns:
+                    with st.expander(asked):
+                        st.markdown(answer)
+                
                 question = st.text_input("Type your question here")
                 
                 if st.button("Get Explanation", key="ask_question"):
                     if question:
-                        with st.spinner("Generating explanation..."):
-                            explanation = get_ai_explanation(question, subject, module["title"])
-                            st.markdown("### Answer")
-                            st.markdown(explanation)
+                        st.markdown("### Answer")
+                        # The answer is shown as it is generated rather than after a spinner
+                        st.write_stream(core.get_ai_explanation(st.session_state, question, subject, module))
                     else:
                         st.warning("Please enter a question")
     else:
         st.info("Please select or create a learning path first")
+    
+    record_render_time("Study Module", started)
+
+# Quiz button callbacks; they run before the panel reruns, so it renders the new state directly
+def start_quiz(exercises):
+    st.session_state.quiz_active = True
+    st.session_state.quiz_questions = exercises
+    st.session_state.quiz_responses = []
+    st.session_state.quiz_batched = st.session_state.feedback_mode.startswith("Quick")
+    st.session_state.quiz_score_saved = False
+
+def submit_answer(question, answer_key, subject, module_id):
+    user_answer = st.session_state[answer_key]
+    correct_answer = question.answer
+    # Quiz answers count towards adaptive practice as well
+    core.record_exercise_result(st.session_state, subject, module_id, question, user_answer == correct_answer)
+    
+    # Answers are graded locally; feedback is generated once the quiz is finished
+    st.session_state.quiz_responses.append({
+        "question": question.question,
+        "user_answer": user_answer,
+        "correct_answer": correct_answer,
+        "explanation": question.explanation,
+        "evaluation": None,
+        "is_correct": user_answer == correct_answer
+    })
+
+def check_practice_answer(subject, question_id, answer_key):
+    question, correct = core.answer_practice_question(st.session_state, subject, question_id, st.session_state[answer_key])
+    st.session_state.practice_result = (subject, question, correct, st.session_state[answer_key])
+
+# Function to show the next question of the learner's practice question bank. Questions come from
+# every module they have opened, weakest material first, and are written in the background before
+# the bank runs out, so the next one is always ready.
+def adaptive_practice(subject, path):
+    st.subheader("Adaptive Practice")
+    st.caption("Questions from every module you have opened, with the ones you find hardest first.")
+    
+    # How the last answer went, shown above the next question
+    result = st.session_state.practice_result
+    if result and result[0] == subject and result[1]:
+        _, question, correct, answer = result
+        if correct:
+            st.success(f"Correct! {question.exercise.explanation}")
+        else:
+            st.error(f"Not quite: you answered {answer}, the answer is {question.exercise.answer}. {question.exercise.explanation}")
+    
+    question = core.next_practice_question(st.session_state, subject)
+    if question is None:
+        st.info("Open a module to start practising")
+        return
+    
+    st.markdown(f"**{path.module(question.module_id).label}**")
+    st.markdown(question.exercise.question)
+    answer_key = f"practice_{subject}_{question.id}_{question.attempts}"
+    if question.exercise.options:
+        st.radio("Your choice:", question.exercise.options, key=answer_key)
+    else:
+        st.text_input("Your reply:", key=answer_key)
+    st.button("Check Answer", on_click=check_practice_answer, args=(subject, question.id, answer_key))
 
 # Tab 3: Practice
-with tab3:
+@st.fragment
+def practice_panel():
+    started = time.perf_counter()
     st.header("Practice Exercises")
     
     if st.session_state.current_subject and st.session_state.current_module:
         subject = st.session_state.current_subject
-        module_id = st.session_state.current_module
         
-        if subject in st.session_state.learning_paths:
-            path = st.session_state.learning_paths[subject]
-            
-            # Module selection for practice
-            all_modules = [f"Module {m['id']}: {m['title']}" for m in path["modules"]]
-            practice_module = st.selectbox(
-                "Select module to practice:", 
-                all_modules,
-                index=module_id-1,
-                key="practice_module"
-            )
-            
-            # Extract module ID from selection
-            practice_id = int(practice_module.split(":")[0].replace("Module ", ""))
+        path = core.load_learning_path(st.session_state, subject)
+        if path:
+            module = select_module(path, "Select module to practice:", key="practice_module")
+            practice_id = module.id
             
-            # Find the selected module
-            module = next((m for m in path["modules"] if m["id"] == practice_id), None)
+            try:
+                load_module(subject, module)
+            except Exception as e:
+                st.error(f"Error generating exercises: {e}")
+                module = None
             
-            if module and "exercises" in module:
+            if module and module.exercises:
                 if not st.session_state.quiz_active:
-                    if st.button("Start Practice Quiz"):
-                        st.session_state.quiz_active = True
-                        st.session_state.quiz_questions = module["exercises"]
-                        st.session_state.quiz_responses = []
-                        st.rerun()
+                    st.radio(
+                        "Feedback style",
+                        ["Quick (one request for the whole quiz)", "Detailed (one request per answer)"],
+                        horizontal=True,
+                        key="feedback_mode"
+                    )
+                    st.button("Start Practice Quiz", on_click=start_quiz, args=(module.exercises,))
                 
                 if st.session_state.quiz_active:
                     # Display quiz questions one by one
@@ -484,40 +511,22 @@ with tab3:
                         question = st.session_state.quiz_questions[q_index]
                         
                         st.subheader(f"Question {q_index + 1}/{len(st.session_state.quiz_questions)}")
-                        st.markdown(question["question"])
+                        st.markdown(question.question)
                         
                         # Multiple choice or text input
-                        if "options" in question:
-                            user_answer = st.radio(
+                        if question.options:
+                            st.radio(
                                 "Select your answer:",
-                                question["options"],
+                                question.options,
                                 key=f"q_{q_index}"
                             )
                         else:
-                            user_answer = st.text_input(
+                            st.text_input(
                                 "Your answer:",
                                 key=f"q_{q_index}"
                             )
                         
-                        if st.button("Submit Answer"):
-                            correct_answer = question["answer"]
-                            evaluation = evaluate_quiz_answer(
-                                user_answer, 
-                                correct_answer, 
-                                question["question"],
-                                subject,
-                                module["title"]
-                            )
-                            
-                            st.session_state.quiz_responses.append({
-                                "question": question["question"],
-                                "user_answer": user_answer,
-                                "correct_answer": correct_answer,
-                                "evaluation": evaluation,
-                                "is_correct": user_answer == correct_answer
-                            })
-                            
-                            st.rerun()
+                        st.button("Submit Answer", on_click=submit_answer, args=(question, f"q_{q_index}", subject, practice_id))
                     else:
                         # Quiz completed - show results
                         st.success("Quiz completed!")
@@ -529,75 +538,132 @@ with tab3:
                         
                         st.metric("Score", f"{score:.1f}%", f"{correct_count}/{total} correct")
                         
-                        # Store score in progress
-                        if subject in st.session_state.progress:
-                            if "quiz_scores" not in st.session_state.progress[subject]:
-                                st.session_state.progress[subject]["quiz_scores"] = []
-                            
-                            st.session_state.progress[subject]["quiz_scores"].append({
-                                "module_id": practice_id,
-                                "score": score,
-                                "date": datetime.now().strftime("%Y-%m-%d %H:%M")
-                            })
+                        # Store score in progress once, not on every rerun of the results screen
+                        if subject in st.session_state.progress and not st.session_state.quiz_score_saved:
+                            st.session_state.quiz_score_saved = True
+                            core.add_quiz_score(st.session_state, subject, practice_id, score)
+                        
+                        pending = [resp for resp in st.session_state.quiz_responses if resp["evaluation"] is None]
                         
-                        # Review answers
+                        # Review answers; feedback that is still being generated fills in its slot as it arrives
                         st.subheader("Review Your Answers")
+                        feedback_slots = []
                         for i, response in enumerate(st.session_state.quiz_responses):
-                            with st.expander(f"Question {i+1}"):
+                            with st.expander(f"Question {i+1}", expanded=bool(pending) and response is pending[0]):
                                 st.markdown(response["question"])
                                 st.markdown(f"**Your answer:** {response['user_answer']}")
                                 st.markdown(f"**Correct answer:** {response['correct_answer']}")
+                                if response.get("explanation"):
+                                    st.markdown(f"**Explanation:** {response['explanation']}")
                                 st.markdown("### Feedback")
-                                st.markdown(response["evaluation"])
+                                if response["evaluation"] is None:
+                                    feedback_slots.append(st.empty())
+                                    feedback_slots[-1].caption("Generating feedback...")
+                                else:
+                                    st.markdown(response["evaluation"])
+                        
+                        if pending and st.session_state.quiz_batched:
+                            # Feedback for the whole quiz comes from one request
+                            with st.spinner("Generating feedback..."):
+                                feedback = core.evaluate_quiz_batch(st.session_state, pending, subject, module.title)
+                            for resp, evaluation, slot in zip(pending, feedback, feedback_slots):
+                                resp["evaluation"] = evaluation
+                                slot.markdown(evaluation)
+                        elif pending:
+                            # Each answer gets its own request. The first one streams in while
+                            # the others are generated concurrently in the background.
+                            slots = dict(zip(map(id, pending), feedback_slots))
+                            futures = submit_answer_evaluations(pending[1:], subject, module.title)
+                            first = pending[0]
+                            first["evaluation"] = slots[id(first)].write_stream(core.evaluate_quiz_answer(
+                                st.session_state, first["user_answer"], first["correct_answer"], first["question"], subject, module.title
+                            ))
+                            for future in concurrent.futures.as_completed(futures):
+                                resp = futures[future]
+                                resp["evaluation"] = future.result()
+                                slots[id(resp)].markdown(resp["evaluation"])
                         
                         if st.button("Close Quiz"):
                             st.session_state.quiz_active = False
                             st.session_state.quiz_questions = []
                             st.session_state.quiz_responses = []
+                            # Bring the Progress tab up to date with the new score
                             st.rerun()
             else:
                 st.warning("No exercises available for this module")
+            
+            st.markdown("---")
+            adaptive_practice(subject, path)
     else:
         st.info("Please select or create a learning path first")
+    
+    record_render_time("Practice", started)
 
-# Tab 4: Progress Tracking
-with tab4:
+# Tab 4: Progress Tracking. It has no widgets of its own, so it only re-renders on full reruns.
+def progress_panel():
+    started = time.perf_counter()
     st.header("Your Learning Progress")
     
+    # Includes paths that are not loaded in this session; completing modules and
+    # taking quizzes update these summaries in place
     if st.session_state.progress:
-        for subject, progress in st.session_state.progress.items():
-            st.subheader(f"Subject: {subject}")
-            st.write(f"Started on: {progress['started']}")
+        for progress in st.session_state.progress.values():
+            st.subheader(f"Subject: {progress.subject}")
+            st.write(f"Started on: {progress.started}")
             
             # Progress percentage
-            if subject in st.session_state.learning_paths:
-                total_modules = len(st.session_state.learning_paths[subject]["modules"])
-                completed_modules = len(progress["modules_completed"])
-                progress_pct = (completed_modules / total_modules) * 100
+            if progress.total_modules:
+                completed_modules = len(progress.completed)
                 
-                st.progress(progress_pct / 100)
-                st.write(f"Completed {completed_modules} out of {total_modules} modules ({progress_pct:.1f}%)")
+                st.progress(progress.percent / 100)
+                st.write(f"Completed {completed_modules} out of {progress.total_modules} modules ({progress.percent:.1f}%)")
                 
                 # List completed modules
                 if completed_modules > 0:
                     st.markdown("### Completed Modules")
-                    completed_ids = progress["modules_completed"]
-                    for module in st.session_state.learning_paths[subject]["modules"]:
-                        if module["id"] in completed_ids:
-                            st.success(f"✓ Module {module['id']}: {module['title']}")
+                    st.success(progress.completed_text)
                 
                 # Quiz scores
-                if "quiz_scores" in progress and progress["quiz_scores"]:
+                if progress.quiz_count:
                     st.markdown("### Quiz Performance")
-                    for score_data in progress["quiz_scores"]:
-                        module = next((m for m in st.session_state.learning_paths[subject]["modules"] 
-                                      if m["id"] == score_data["module_id"]), None)
-                        if module:
-                            st.write(f"Module {score_data['module_id']} ({module['title']}): " +
-                                    f"{score_data['score']:.1f}% on {score_data['date']}")
+                    st.write(progress.quiz_text)
     else:
         st.info("No learning progress yet. Start by creating a learning path!")
+    
+    record_render_time("Progress", started)
+
+with tab1:
+    learning_path_panel()
+
+with tab2:
+    study_panel()
+
+with tab3:
+    practice_panel()
+
+with tab4:
+    progress_panel()
 
 # Footer
 st.markdown("---")
-st.markdown("© 2025 Personalized Learning Assistant. All rights reserved.❤️ | Powered by Gemini AI | Created with Streamlit")
\ No newline at end of file
+st.markdown("© 2025 Personalized Learning Assistant. All rights reserved.❤️ | Powered by Gemini AI | Created with Streamlit")
+
+# Create the model client on a background thread once the first page is out, so
+# neither that page nor the first model call waits for the client library to
+# import. A client that fails to load reports its error on the first model call.
+@st.cache_resource(show_spinner=False)
+def prepare_model_in_background(backend, api_key):
+    def prepare():
+        with startup_profile.step(f"create {backend} model client (background)"):
+            try:
+                model.prepare()
+            except Exception:
+                pass
+        startup_profile.report()
+    threading.Thread(target=prepare, name="model-prepare", daemon=True).start()
+
+if model is not None:
+    prepare_model_in_background(model_backend, api_key)
+
+startup_profile.record("first run of app.py", time.perf_counter() - run_started)
+startup_profile.report()
\ No newline at end of file
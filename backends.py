@@ -0,0 +1,271 @@
+import asyncio
+import json
+import os
+import random
+import re
+import threading
+import time
+import zlib
+from collections import deque
+
+from path_parser import LEARNING_PATH_SCHEMA, MODULE_DETAILS_SCHEMA, OUTLINE_SCHEMA, PRACTICE_QUESTIONS_SCHEMA
+
+
+# Model backends. A backend is any object with the part of the GenerativeModel
+# API the app uses: generate_content(prompt, generation_config=None, stream=False)
+# returning a response with .text (or an iterable of chunks when streaming) and
+# .usage_metadata, plus an async generate_content_async.
+def create_model(backend, api_key=None):
+    if backend == "fake":
+        return FakeModel.from_env()
+    if backend != "gemini":
+        raise ValueError(f"unknown model backend: {backend}")
+
+    try:
+        import google.generativeai as genai
+    except ImportError:
+        raise ImportError("Failed to import google-generativeai. Please make sure it's installed.")
+
+    genai.configure(api_key=api_key)
+    return genai.GenerativeModel(
+        model_name="gemini-2.0-flash",
+        generation_config={
+            "temperature": 0.7,
+            "top_p": 0.95,
+            "top_k": 40,
+            "max_output_tokens": 8192,
+        }
+    )
+
+
+# Model that is only created on its first call, so importing and configuring a
+# backend's client library (for Gemini, a gRPC and protobuf stack that takes about
+# a second to import) does not hold up whatever starts first. prepare() creates it
+# ahead of time, e.g. on a background thread once the app has started.
+class LazyModel:
+    def __init__(self, factory):
+        self._factory = factory
+        self._model = None
+        self._lock = threading.Lock()
+
+    def prepare(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = self._factory()
+        return self._model
+
+    def generate_content(self, prompt, *args, **kwargs):
+        return self.prepare().generate_content(prompt, *args, **kwargs)
+
+    async def generate_content_async(self, prompt, *args, **kwargs):
+        return await self.prepare().generate_content_async(prompt, *args, **kwargs)
+
+
+# Raised by the fake model the way the API reports errors; code is the HTTP status
+class FakeAPIError(Exception):
+    def __init__(self, code, message):
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+
+class FakeUsage:
+    def __init__(self, prompt_token_count, candidates_token_count):
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+        self.total_token_count = prompt_token_count + candidates_token_count
+
+
+class FakeResponse:
+    def __init__(self, text, usage_metadata):
+        self.text = text
+        self.usage_metadata = usage_metadata
+
+
+class FakeStreamResponse:
+    def __init__(self, chunks, usage_metadata, chunk_delay):
+        self._chunks = chunks
+        self._chunk_delay = chunk_delay
+        self.usage_metadata = usage_metadata
+        self.text = "".join(chunks)
+
+    def __iter__(self):
+        for chunk in self._chunks:
+            if self._chunk_delay:
+                time.sleep(self._chunk_delay)
+            yield FakeResponse(chunk, self.usage_metadata)
+
+
+# Rough token count, close enough to compare prompts and outputs with each other
+def estimate_tokens(text):
+    return max(1, len(text) // 4)
+
+
+# Build a learning path with the given number of modules from a seeded generator
+def fake_learning_path(subject, num_modules, exercises_per_module=3, seed=0, outline=False):
+    rng = random.Random(seed)
+    modules = []
+    for module_id in range(1, num_modules + 1):
+        module = {
+            "id": module_id,
+            "title": f"{subject} part {module_id}",
+            "description": f"Key ideas of {subject}, step {module_id}.",
+        }
+        if not outline:
+            module.update(fake_module_details(subject, module_id, exercises_per_module, rng.random()))
+        modules.append(module)
+    return {
+        "subject": subject,
+        "overview": f"A {num_modules} module introduction to {subject}.",
+        "modules": modules,
+    }
+
+
+def fake_module_details(subject, module_id, num_exercises=3, seed=0):
+    rng = random.Random(seed)
+    paragraphs = [
+        f"Paragraph {i + 1} about {subject} in module {module_id}: " + " ".join(
+            rng.choice(["concept", "example", "diagram", "practice", "detail", "summary"]) for _ in range(60)
+        )
+        for i in range(6)
+    ]
+    exercises = []
+    for i in range(num_exercises):
+        options = [f"Option {letter} for question {i + 1}" for letter in "ABCD"]
+        exercises.append({
+            "question": f"Question {i + 1} on module {module_id} of {subject}?",
+            "options": options,
+            "answer": rng.choice(options),
+            "explanation": f"Explanation for question {i + 1}.",
+        })
+    return {
+        "content": f"### Module {module_id}\n\n" + "\n\n".join(paragraphs),
+        "exercises": exercises,
+        "additional_resources": [f"{subject} reference {i + 1}" for i in range(2)],
+    }
+
+
+# Practice questions spread over the given modules; the seed makes their wording unique
+def fake_practice_questions(subject, module_ids, count, seed=0):
+    rng = random.Random(seed)
+    questions = []
+    for i in range(count):
+        module_id = module_ids[i % len(module_ids)]
+        options = [f"Option {letter}" for letter in "ABCD"]
+        questions.append({
+            "module_id": module_id,
+            "question": f"Practice question {rng.getrandbits(32):08x} on module {module_id} of {subject}?",
+            "options": options,
+            "answer": rng.choice(options),
+            "explanation": f"Explanation for practice question {i + 1}.",
+        })
+    return questions
+
+
+# Deterministic offline stand-in for the Gemini model. Output is derived from the
+# requested schema and the prompt, seeded so the same prompt always gets the same
+# answer. Latency, stream chunking and malformed JSON can all be configured, as can
+# per-minute request and token quotas and a rate of transient server errors, so
+# rate limiting and retries can be exercised without touching the real API.
+class FakeModel:
+    def __init__(self, seed=0, latency=0.0, chunk_size=256, chunk_delay=0.0,
+                 malformed_rate=0.0, num_modules=6, exercises_per_module=3,
+                 rpm_limit=0, tpm_limit=0, error_rate=0.0):
+        self.seed = seed
+        self.latency = latency
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self.malformed_rate = malformed_rate
+        self.num_modules = num_modules
+        self.exercises_per_module = exercises_per_module
+        self.rpm_limit = rpm_limit
+        self.tpm_limit = tpm_limit
+        self.error_rate = error_rate
+        self._window = deque()    # (time, tokens) of requests in the last minute
+        self._errors = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            seed=int(os.getenv("FAKE_MODEL_SEED", "0")),
+            latency=float(os.getenv("FAKE_MODEL_LATENCY", "0")),
+            chunk_size=int(os.getenv("FAKE_MODEL_CHUNK_SIZE", "256")),
+            chunk_delay=float(os.getenv("FAKE_MODEL_CHUNK_DELAY", "0")),
+            malformed_rate=float(os.getenv("FAKE_MODEL_MALFORMED_RATE", "0")),
+            num_modules=int(os.getenv("FAKE_MODEL_MODULES", "6")),
+            exercises_per_module=int(os.getenv("FAKE_MODEL_EXERCISES", "3")),
+            rpm_limit=int(os.getenv("FAKE_MODEL_RPM", "0")),
+            tpm_limit=int(os.getenv("FAKE_MODEL_TPM", "0")),
+            error_rate=float(os.getenv("FAKE_MODEL_ERROR_RATE", "0")),
+        )
+
+    # Enforce the simulated quotas over a sliding one minute window
+    def _admit(self, prompt):
+        tokens = estimate_tokens(prompt)
+        now = time.monotonic()
+        with self._lock:
+            while self._window and now - self._window[0][0] >= 60:
+                self._window.popleft()
+            if self.rpm_limit and len(self._window) >= self.rpm_limit:
+                raise FakeAPIError(429, "Resource has been exhausted (requests per minute).")
+            if self.tpm_limit and sum(t for _, t in self._window) + tokens > self.tpm_limit:
+                raise FakeAPIError(429, "Resource has been exhausted (tokens per minute).")
+            if self.error_rate and self._errors.random() < self.error_rate:
+                raise FakeAPIError(503, "The service is currently unavailable.")
+            self._window.append((now, tokens))
+
+    def _respond(self, prompt, generation_config):
+        rng = random.Random(self.seed ^ zlib.crc32(prompt.encode("utf-8")))
+        schema = (generation_config or {}).get("response_schema")
+        match = re.search(r"(?:teaching|path for|path on|learning about) (.+?)(?: to a | at | for a |, specifically)", prompt)
+        subject = match.group(1) if match else "the subject"
+
+        if schema is LEARNING_PATH_SCHEMA:
+            data = fake_learning_path(subject, self.num_modules, self.exercises_per_module, rng.random())
+        elif schema is OUTLINE_SCHEMA:
+            data = fake_learning_path(subject, self.num_modules, seed=rng.random(), outline=True)
+        elif schema is MODULE_DETAILS_SCHEMA:
+            match = re.search(r"Write module (\d+)", prompt)
+            data = fake_module_details(subject, int(match.group(1)) if match else 1,
+                                       self.exercises_per_module, rng.random())
+        elif schema is PRACTICE_QUESTIONS_SCHEMA:
+            match = re.search(r"Write (\d+) new", prompt)
+            data = fake_practice_questions(subject, [int(m) for m in re.findall(r"Module (\d+):", prompt)] or [1],
+                                           int(match.group(1)) if match else 5, rng.random())
+        elif schema is not None and schema.get("type") == "ARRAY":
+            match = re.search(r"exactly (\d+)", prompt)
+            data = [f"Feedback for answer {i + 1}." for i in range(int(match.group(1)) if match else 1)]
+        elif "simple learning path" in prompt:
+            data = fake_learning_path(subject, 3, 2, rng.random())
+        else:
+            return f"Here is a detailed answer for {subject}.\n\n" + " ".join(
+                rng.choice(["explanation", "example", "insight", "tip", "analogy"]) for _ in range(150)
+            )
+
+        text = json.dumps(data, indent=2)
+        if rng.random() < self.malformed_rate:
+            # Cut the reply off mid-way, the way a truncated or broken generation looks
+            text = text[:rng.randint(len(text) // 2, len(text) - 2)]
+        return text
+
+    def _usage(self, prompt, text):
+        return FakeUsage(estimate_tokens(prompt), estimate_tokens(text))
+
+    def generate_content(self, prompt, generation_config=None, stream=False, **kwargs):
+        self._admit(prompt)
+        text = self._respond(prompt, generation_config)
+        if self.latency:
+            time.sleep(self.latency)
+        if not stream:
+            return FakeResponse(text, self._usage(prompt, text))
+
+        chunks = [text[i:i + self.chunk_size] for i in range(0, len(text), self.chunk_size)]
+        return FakeStreamResponse(chunks, self._usage(prompt, text), self.chunk_delay)
+
+    async def generate_content_async(self, prompt, generation_config=None, **kwargs):
+        self._admit(prompt)
+        text = self._respond(prompt, generation_config)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return FakeResponse(text, self._usage(prompt, text))
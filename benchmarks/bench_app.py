@@ -0,0 +1,126 @@
+# Benchmark end-to-end reruns of app.py against the offline fake model, using
+# Streamlit's headless app-testing API. For learners with several paths of 3 to
+# 50 modules it reports the median full script rerun time and the render cost of
+# each panel, plus the time to create a learning path through the UI. The
+# profile, Study and Practice panels are fragments, so an interaction inside one
+# of them costs roughly its own column rather than a full rerun.
+#
+#   python benchmarks/bench_app.py [--repeat 10] [--paths 5]
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SIZES = [3, 10, 25, 50]
+PANELS = ["Profile", "Learning Path", "Study Module", "Practice", "Progress"]
+
+
+# Point the app at the fake model and throwaway storage before it is first imported
+def configure_environment(directory):
+    os.environ["MODEL_BACKEND"] = "fake"
+    os.environ["LEARNING_DB_FILE"] = os.path.join(directory, "learning.db")
+    os.environ["PATH_CACHE_FILE"] = os.path.join(directory, "learning_paths.json")
+
+
+# Store a learner with finished modules and a quiz history on each of their paths
+def seed_learner(store, learner_id, num_paths, num_modules):
+    from backends import fake_learning_path
+
+    for path_number in range(num_paths):
+        subject = f"Subject {path_number + 1}"
+        store.save_path(learner_id, subject, fake_learning_path(subject, num_modules), None, "2025-01-01")
+        for module_id in range(1, num_modules // 2 + 1):
+            store.complete_module(learner_id, subject, module_id, module_id + 1)
+        for module_id in range(1, num_modules + 1):
+            for attempt in range(4):
+                store.add_quiz_score(learner_id, subject, module_id, 25.0 * attempt, "2025-01-02 10:00")
+    store.flush()
+    return "Subject 1"
+
+
+# Open the app as the learner saved under learner_id, the way their saved link does
+def start_app(learner_id=None):
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=120)
+    if learner_id:
+        app.query_params["learner"] = learner_id
+    app.run()
+    return app
+
+
+def check(app):
+    if app.exception:
+        raise RuntimeError(app.exception[0].value)
+
+
+def bench_reruns(store, size, args):
+    # Saved learners have ids in the app's own format
+    learner_id = f"bench-{size}".ljust(22, "0")
+    subject = seed_learner(store, learner_id, args.paths, size)
+
+    app = start_app(learner_id)
+    app.session_state["current_subject"] = subject
+    app.session_state["current_module"] = 1
+    app.run()
+    check(app)
+
+    rerun_times = []
+    panel_times = {panel: [] for panel in PANELS}
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        app.run()
+        rerun_times.append(time.perf_counter() - started)
+        check(app)
+        for panel, timing in app.session_state["render_timings"].items():
+            panel_times[panel].append(timing)
+
+    return statistics.median(rerun_times), {
+        panel: statistics.median(times) if times else 0.0 for panel, times in panel_times.items()
+    }
+
+
+def bench_create_path(args):
+    app = start_app("bench-create".ljust(22, "0"))
+    times = []
+    for attempt in range(args.repeat):
+        # A new subject every time, so the shared path cache never answers
+        subject_input = next(t for t in app.text_input if t.label == "What subject would you like to learn?")
+        subject_input.input(f"Benchmark subject {attempt}")
+        next(b for b in app.button if b.label == "Create Learning Path").click()
+        started = time.perf_counter()
+        app.run()
+        times.append(time.perf_counter() - started)
+        check(app)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark app.py reruns with the fake model")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--paths", type=int, default=5, help="learning paths per learner")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        configure_environment(directory)
+        from storage import LearningStore
+
+        store = LearningStore(os.environ["LEARNING_DB_FILE"])
+
+        print(f"{'modules':>7} {'rerun ms':>9} " + " ".join(f"{panel:>14}" for panel in PANELS))
+        for size in SIZES:
+            rerun_time, panel_times = bench_reruns(store, size, args)
+            print(f"{size:>7} {rerun_time * 1000:>9.1f} " + " ".join(
+                f"{panel_times[panel] * 1000:>14.1f}" for panel in PANELS
+            ))
+
+        print(f"\ncreate learning path (fake model): {bench_create_path(args) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# Benchmark the content catalog with a few thousand pre-generated paths: size on
+# disk against plain JSON, lookup and module read latency, and how much memory a
+# session holds for a catalog path compared with a full copy of it.
+#
+#   python benchmarks/bench_catalog.py [--paths 2000] [--modules 8]
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backends import fake_learning_path
+from catalog import ContentCatalog
+from learning_path import LearningPath
+
+
+def median_us(fn, keys):
+    times = []
+    for key in keys:
+        started = time.perf_counter()
+        fn(key)
+        times.append(time.perf_counter() - started)
+    return statistics.median(times) * 1e6
+
+
+def traced_size(fn):
+    tracemalloc.start()
+    kept = fn()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the content catalog")
+    parser.add_argument("--paths", type=int, default=2000)
+    parser.add_argument("--modules", type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        catalog = ContentCatalog(directory)
+        keys = [(f"subject {i}", "beginner", "visual") for i in range(args.paths)]
+        json_bytes = 0
+        started = time.perf_counter()
+        for i, key in enumerate(keys):
+            learning_path = fake_learning_path(key[0], args.modules, 4, seed=i)
+            json_bytes += len(json.dumps(learning_path))
+            catalog.put(key, learning_path)
+        write_time = time.perf_counter() - started
+        disk_bytes = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+
+        print(f"{args.paths} paths x {args.modules} modules, written in {write_time:.2f}s")
+        print(f"JSON {json_bytes / 2**20:.1f} MiB, catalog on disk {disk_bytes / 2**20:.1f} MiB")
+
+        # A fresh handle, as a newly started server process would see the catalog
+        catalog = ContentCatalog(directory)
+        started = time.perf_counter()
+        print(f"index load: {len(catalog)} paths in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+        sample = random.Random(0).sample(keys, min(500, len(keys)))
+        print(f"outline lookup: {median_us(catalog.outline, sample):.0f} us")
+        print(f"module read, cold: {median_us(lambda key: catalog.module_details(key, 2), sample):.0f} us")
+        # Recently read modules stay decompressed
+        print(f"module read, warm: {median_us(lambda key: catalog.module_details(key, 2), sample[-100:]):.0f} us")
+
+        # Without the shared decompressed modules, so only what the session holds is counted
+        catalog = ContentCatalog(directory, max_decompressed=0)
+        len(catalog)
+        held = sample[:50]
+        full = traced_size(lambda: [LearningPath.from_dict(catalog.get(key)) for key in held])
+        handles = traced_size(lambda: [
+            LearningPath.from_dict(catalog.outline(key), lambda module_id, key=key: catalog.module_details(key, module_id))
+            for key in held
+        ])
+        print(f"session memory for {len(held)} paths: full copies {full / 1024:.0f} KiB, catalog handles {handles / 1024:.0f} KiB")
+
+
+if __name__ == "__main__":
+    main()
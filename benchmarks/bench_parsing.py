@@ -0,0 +1,59 @@
+# Benchmark JSON extraction and parsing of learning paths from 3 to 50 modules.
+# Runs offline: paths come from the fake model's seeded generator.
+#
+#   python benchmarks/bench_parsing.py [--repeat 20]
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backends import fake_learning_path
+from path_parser import IncrementalPathParser, parse_learning_path
+
+SIZES = [3, 6, 12, 25, 50]
+
+
+def median_time(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times)
+
+
+def stream_parse(text, chunk_size=256):
+    parser = IncrementalPathParser()
+    for i in range(0, len(text), chunk_size):
+        parser.feed(text[i:i + chunk_size])
+    return parser.result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark learning path parsing")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'modules':>7} {'KiB':>7} {'parse ms':>9} {'fenced ms':>10} {'salvage ms':>11} {'stream ms':>10}")
+    for num_modules in SIZES:
+        text = json.dumps(fake_learning_path("Python", num_modules), indent=2)
+        fenced = f"```json\n{text}\n```"
+        truncated = text[:int(len(text) * 0.8)]
+
+        timings = [
+            median_time(lambda: parse_learning_path(text), args.repeat),
+            median_time(lambda: parse_learning_path(fenced), args.repeat),
+            median_time(lambda: parse_learning_path(truncated), args.repeat),
+            median_time(lambda: stream_parse(text), args.repeat),
+        ]
+        print(f"{num_modules:>7} {len(text) / 1024:>7.1f} " + " ".join(
+            f"{timing * 1000:>{width}.2f}" for timing, width in zip(timings, (9, 10, 11, 10))
+        ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# Benchmark the adaptive practice scheduler as a learner's question bank grows:
+# how long picking the next question and recording the answer take at each bank
+# size, next to picking by scanning every question for the weakest due one.
+#
+#   python benchmarks/bench_question_bank.py [--sizes 100,1000,10000,100000] [--answers 2000]
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from learning_path import Exercise
+from question_bank import QuestionBank
+
+
+def build_bank(size, modules, rng):
+    bank = QuestionBank()
+    bank.seeded.update(range(1, modules + 1))
+    for i in range(size):
+        bank.add(rng.randint(1, modules), Exercise(f"Question {i}?", ("A", "B", "C", "D"), "A"))
+    bank.set_module_scores({module_id: rng.uniform(0, 100) for module_id in range(1, modules + 1)})
+    return bank
+
+
+# The same choice as QuestionBank.next, made by looking at every question
+def scan_next(bank):
+    due = [q for q in bank.questions.values() if q.due <= bank.answered]
+    if due:
+        return min(due, key=lambda q: (-q.weakness(bank.module_weakness.get(q.module_id, 0.5)), q.id))
+    return min(bank.questions.values(), key=lambda q: (q.due, q.id))
+
+
+def practise(bank, answers, rng, pick):
+    times = []
+    for _ in range(answers):
+        started = time.perf_counter()
+        question = pick(bank)
+        bank.record(question.id, rng.random() < 0.7)
+        times.append(time.perf_counter() - started)
+    return statistics.median(times) * 1e6, max(times) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the practice question scheduler")
+    parser.add_argument("--sizes", default="100,1000,10000,100000")
+    parser.add_argument("--answers", type=int, default=2000)
+    parser.add_argument("--modules", type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"{args.answers} answers per bank, 70% correct")
+    print(f"{'questions':>10} {'heap p50 us':>12} {'heap max us':>12} {'scan p50 us':>12}")
+    for size in (int(size) for size in args.sizes.split(",")):
+        heap_p50, heap_max = practise(build_bank(size, args.modules, random.Random(size)), args.answers,
+                                      random.Random(0), QuestionBank.next)
+        # Scanning is slow enough on big banks that fewer answers give a fair median
+        scan_p50, _ = practise(build_bank(size, args.modules, random.Random(size)), min(args.answers, 200),
+                               random.Random(0), scan_next)
+        print(f"{size:>10} {heap_p50:>12.1f} {heap_max:>12.1f} {scan_p50:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# Benchmark cold start: the app's first run in a fresh interpreter, the way a new
+# server worker or replica sees it. Each run starts a new Python process, so
+# nothing is imported or cached yet. Imports made during the first run are broken
+# down per top-level package with python -X importtime, next to the app's own
+# startup profile (STARTUP_PROFILE=1). With --budget-ms the benchmark exits with
+# an error when the first run takes longer than that, to catch startup regressions.
+#
+#   python benchmarks/bench_startup.py [--repeat 3] [--backend gemini] [--budget-ms 2000]
+#
+# The gemini backend is given a dummy API key; nothing is sent as long as the
+# first run makes no model calls.
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MARKER = "--- first run ---"
+
+# Runs in the child process; the marker separates the harness's own imports from the app's
+CHILD = f"""
+import sys, time
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file({os.path.join(ROOT, "app.py")!r}, default_timeout=120)
+print({MARKER!r}, file=sys.stderr, flush=True)
+started = time.perf_counter()
+app.run()
+elapsed = time.perf_counter() - started
+print({MARKER!r}, file=sys.stderr, flush=True)
+if app.exception:
+    raise RuntimeError(app.exception[0].value)
+print(elapsed)
+"""
+
+
+# Sum the cumulative import time of each top-level package imported between the markers
+def imports_by_package(stderr):
+    sections = stderr.split(MARKER)
+    lines = sections[1].splitlines() if len(sections) > 2 else []
+    totals = defaultdict(float)
+    for line in lines:
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        if name.startswith("  ") or not cumulative.strip().isdigit():
+            continue  # imported by another module that is already counted
+        totals[name.strip().split(".")[0]] += int(cumulative) / 1000
+    return totals
+
+
+def profile_lines(stderr):
+    return [line for line in stderr.splitlines() if line.startswith("startup:")]
+
+
+def first_run(backend):
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(
+            os.environ,
+            MODEL_BACKEND=backend,
+            GEMINI_API_KEY=os.getenv("GEMINI_API_KEY", "dummy-key"),
+            STARTUP_PROFILE="1",
+            LEARNING_DB_FILE=os.path.join(directory, "learning.db"),
+            PATH_CACHE_FILE=os.path.join(directory, "paths.json"),
+            CATALOG_DIR=os.path.join(directory, "catalog"),
+        )
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", CHILD],
+            cwd=ROOT, env=env, capture_output=True, text=True
+        )
+    if result.returncode:
+        raise RuntimeError(result.stderr[-2000:])
+    return float(result.stdout.strip().splitlines()[-1]), result.stderr
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the app's cold start")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--backend", default="gemini")
+    parser.add_argument("--budget-ms", type=float, default=0, help="fail when the median first run is slower")
+    parser.add_argument("--top", type=int, default=10, help="packages to list")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args()
+
+    runs = [first_run(args.backend) for _ in range(args.repeat)]
+    median_ms = statistics.median(elapsed for elapsed, _ in runs) * 1000
+    # The breakdown is from the last run; the first may include filling the OS file cache
+    imports = sorted(imports_by_package(runs[-1][1]).items(), key=lambda item: -item[1])
+
+    if args.json:
+        print(json.dumps({"first_run_ms": median_ms, "imports_ms": dict(imports)}))
+    else:
+        print(f"first run ({args.backend} backend), median of {args.repeat}: {median_ms:.0f} ms")
+        print("\nimported during the first run:")
+        for package, ms in imports[:args.top]:
+            print(f"{ms:10.1f} ms  {package}")
+        print("\napp startup profile:")
+        for line in profile_lines(runs[-1][1]):
+            print("  " + line)
+
+    if args.budget_ms and median_ms > args.budget_ms:
+        print(f"\nfirst run took {median_ms:.0f} ms, over the {args.budget_ms:.0f} ms budget", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
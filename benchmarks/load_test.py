@@ -0,0 +1,334 @@
+# Load test: many learners using the app at the same time in one process, the
+# way a single Streamlit server process serves its sessions. Every learner is a
+# headless AppTest session walking through a whole journey against the fake
+# model: open the app, enter their name, create a learning path, ask questions
+# about the first module, take its quiz, mark it complete and look at their
+# progress. Sessions share the process's caches, model scheduler and store like
+# real ones do; a handful of subjects are spread over the learners, so some of
+# them get paths others already generated.
+#
+# It reports p50/p95/p99 latency per interaction, throughput, peak RSS and the
+# memory each session adds. Give several session counts to run each one in a
+# fresh process and get one row per count:
+#
+#   python benchmarks/load_test.py --sessions 10 [--latency 0.5] [--chunk-delay 0.02] [--think 1]
+#   python benchmarks/load_test.py --sessions 1,5,10,20,40
+#
+# AppTest reruns the whole script for every interaction, including clicks in
+# fragments, so latencies are those of full reruns. --latency and --chunk-delay
+# set how slow the fake model is (seconds before a reply, seconds between
+# streamed chunks); --think is the most a learner waits between interactions.
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SUBJECTS = ["Python", "Statistics", "Spanish", "Music Theory", "Chemistry"]
+QUESTIONS = [
+    "Can you explain this with an example?",
+    "Why does this matter in practice?",
+    "What is a common mistake here?",
+    "How does this connect to the previous module?",
+]
+INTERACTIONS = [
+    "open app", "enter name", "create path", "ask question", "start quiz",
+    "answer question", "finish quiz", "close quiz", "complete module", "view progress",
+]
+
+
+# Point the app at the fake model and throwaway storage before it is first imported
+def configure_environment(directory, args):
+    os.environ["MODEL_BACKEND"] = "fake"
+    os.environ["LEARNING_DB_FILE"] = os.path.join(directory, "learning.db")
+    os.environ["PATH_CACHE_FILE"] = os.path.join(directory, "learning_paths.json")
+    os.environ["CATALOG_DIR"] = os.path.join(directory, "catalog")
+    os.environ["FAKE_MODEL_LATENCY"] = str(args.latency)
+    os.environ["FAKE_MODEL_CHUNK_DELAY"] = str(args.chunk_delay)
+
+
+def rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return 0
+
+
+def peak_rss_bytes():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+# AppTest is made for one test at a time: every run installs a mock runtime and
+# the app-test config, and takes them away when it ends, from under any run still
+# going in another thread. Keep a runtime and that config in place for the whole
+# load test instead. Every run also compiles the script afresh, which is not safe
+# to do from several threads at once; share one compiled script between sessions,
+# as a server does. Finally, every run forgets whether the app has a pages/
+# directory, and a run in another thread that looks in between runs the app as a
+# single page, under different widget IDs, so the inputs of its session are lost.
+@contextmanager
+def concurrent_app_tests():
+    from unittest.mock import MagicMock, patch
+
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.pages_manager import PagesManager
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import app_test, local_script_runner
+    from streamlit.testing.v1.util import patch_config_options
+
+    shared = MagicMock(spec=Runtime)
+    shared.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    shared.cache_storage_manager = MemoryCacheStorageManager()
+    script_cache = ScriptCache()
+
+    # AppTest resets the flag on this subclass; the runs read it from PagesManager
+    class PagesManagerKeepingLayout(PagesManager):
+        pass
+
+    with patch_config_options({"global.appTest": True}), \
+            patch.object(Runtime, "instance", classmethod(lambda cls: cls._instance or shared)), \
+            patch.object(Runtime, "exists", classmethod(lambda cls: True)), \
+            patch.object(app_test, "ScriptCache", lambda: script_cache), \
+            patch.object(app_test, "PagesManager", PagesManagerKeepingLayout), \
+            patch.object(local_script_runner, "ScriptCache", lambda: script_cache):
+        yield
+
+
+class JourneyFailed(Exception):
+    pass
+
+
+# One learner's way through the app. Every interaction is timed as the rerun it triggers.
+class Journey:
+    def __init__(self, number, args, results):
+        self.number = number
+        self.args = args
+        self.results = results
+        self.rng = random.Random(number)
+        self.app = None
+
+    def run(self, interaction):
+        started = time.perf_counter()
+        try:
+            self.app.run()
+            error = str(self.app.exception[0].value) if self.app.exception else None
+        except Exception as e:
+            error = repr(e)
+        self.results.append((interaction, time.perf_counter() - started, error))
+        if error:
+            raise JourneyFailed(f"{interaction}: {error}")
+
+    # The widget with this label, failing the journey with what the page shows instead
+    def find(self, widgets, label):
+        for widget in widgets:
+            if widget.label == label:
+                return widget
+        shown = [e.value for e in self.app.error] + [w.value for w in self.app.warning] + [i.value for i in self.app.info]
+        raise JourneyFailed(f"no {label!r} on the page" + (f" (it shows {shown})" if shown else ""))
+
+    def think(self):
+        if self.args.think:
+            time.sleep(self.rng.uniform(0, self.args.think))
+
+    def walk(self):
+        from streamlit.testing.v1 import AppTest
+
+        self.app = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=300)
+        self.run("open app")
+        self.think()
+
+        self.find(self.app.sidebar.text_input, "Your Name").input(f"learner-{self.number}")
+        self.run("enter name")
+        self.think()
+
+        self.find(self.app.text_input, "What subject would you like to learn?").input(SUBJECTS[self.number % len(SUBJECTS)])
+        self.find(self.app.button, "Create Learning Path").click()
+        self.run("create path")
+        self.think()
+
+        for question in self.rng.sample(QUESTIONS, min(self.args.questions, len(QUESTIONS))):
+            self.find(self.app.text_input, "Type your question here").input(question)
+            self.find(self.app.button, "Get Explanation").click()
+            self.run("ask question")
+            self.think()
+
+        feedback = self.args.feedback
+        if feedback == "mixed":
+            feedback = "quick" if self.number % 2 == 0 else "detailed"
+        self.find(self.app.radio, "Feedback style").set_value(
+            "Quick (one request for the whole quiz)" if feedback == "quick" else "Detailed (one request per answer)"
+        )
+        self.find(self.app.button, "Start Practice Quiz").click()
+        self.run("start quiz")
+        while any(b.label == "Submit Answer" for b in self.app.button):
+            answers = [r for r in self.app.radio if r.label == "Select your answer:"]
+            if answers:
+                answers[0].set_value(self.rng.choice(answers[0].options))
+            self.find(self.app.button, "Submit Answer").click()
+            self.think()
+            # The last answer's rerun shows the results and generates the feedback
+            self.run("answer question" if self._questions_left() > 1 else "finish quiz")
+        self.find(self.app.button, "Close Quiz").click()
+        self.run("close quiz")
+        self.think()
+
+        self.find(self.app.button, "Mark Module as Complete").click()
+        self.run("complete module")
+        self.think()
+
+        self.run("view progress")
+        return self.app
+
+    # Questions left in the running quiz, counting the one on screen
+    def _questions_left(self):
+        quiz = self.app.session_state["quiz_questions"]
+        return len(quiz) - len(self.app.session_state["quiz_responses"])
+
+
+def run_load(args):
+    # One journey first, so imports, the fake model and the shared caches are in
+    # place and do not count as session memory
+    Journey(-1, argparse.Namespace(**{**vars(args), "think": 0}), []).walk()
+    baseline_rss = rss_bytes()
+
+    # Sample RSS while the test runs, since ru_maxrss includes everything before it
+    peak = [baseline_rss]
+    stop = threading.Event()
+
+    def sample():
+        while not stop.wait(0.1):
+            peak[0] = max(peak[0], rss_bytes())
+    threading.Thread(target=sample, daemon=True).start()
+
+    results = []
+    failures = []
+
+    def start(number):
+        # Spread session starts over the ramp-up time
+        time.sleep(args.ramp * number / args.sessions)
+        try:
+            return Journey(number, args, results).walk()
+        except JourneyFailed as e:
+            failures.append(str(e))
+            return None
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.sessions) as executor:
+        apps = list(executor.map(start, range(args.sessions)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    # The finished sessions are still alive here, as they would be on a server
+    session_rss = rss_bytes()
+    peak[0] = max(peak[0], session_rss)
+
+    latencies = defaultdict(list)
+    for interaction, seconds, error in results:
+        if error is None:
+            latencies[interaction].append(seconds)
+    report = {
+        "sessions": args.sessions,
+        "completed": sum(app is not None for app in apps),
+        "failures": failures,
+        "elapsed_s": elapsed,
+        "interactions_per_s": len(results) / elapsed,
+        "journeys_per_min": sum(app is not None for app in apps) / elapsed * 60,
+        "peak_rss_mib": max(peak[0], peak_rss_bytes()) / 2 ** 20,
+        "per_session_kib": (session_rss - baseline_rss) / args.sessions / 1024,
+        "latency_ms": {},
+    }
+    for interaction in INTERACTIONS:
+        values = sorted(latencies.get(interaction, []))
+        report["latency_ms"][interaction] = {
+            "count": len(values),
+            **{f"p{int(q * 100)}": percentile(values, q) * 1000 for q in (0.5, 0.95, 0.99)},
+        }
+    return report
+
+
+def print_report(report):
+    print(f"{report['sessions']} sessions: {report['completed']} journeys completed in "
+          f"{report['elapsed_s']:.1f} s, {len(report['failures'])} failed")
+    for failure in report["failures"][:5]:
+        print(f"  failed at {failure}")
+    print(f"\n{'interaction':<16} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for interaction, row in report["latency_ms"].items():
+        print(f"{interaction:<16} {row['count']:>6} {row['p50']:>9.0f} {row['p95']:>9.0f} {row['p99']:>9.0f}")
+    print(f"\nthroughput: {report['interactions_per_s']:.1f} interactions/s, {report['journeys_per_min']:.1f} journeys/min")
+    print(f"peak RSS: {report['peak_rss_mib']:.0f} MiB, memory per session: {report['per_session_kib']:.0f} KiB")
+
+
+# Run every session count in its own process, so caches and memory start fresh each time
+def sweep(counts, args):
+    options = [
+        "--questions", str(args.questions), "--feedback", args.feedback, "--latency", str(args.latency),
+        "--chunk-delay", str(args.chunk_delay), "--think", str(args.think), "--ramp", str(args.ramp),
+    ]
+    rows = []
+    for count in counts:
+        command = [sys.executable, os.path.abspath(__file__), "--sessions", str(count), "--json"] + options
+        output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+        rows.append(json.loads(output.strip().splitlines()[-1]))
+        row = rows[-1]
+        print(f"{count} sessions done in {row['elapsed_s']:.1f} s", file=sys.stderr, flush=True)
+
+    print(f"{'sessions':>8} {'failed':>6} {'ask p50':>8} {'ask p95':>8} {'ask p99':>8} {'path p95':>9} "
+          f"{'int/s':>6} {'peak MiB':>9} {'KiB/sess':>9}")
+    for row in rows:
+        ask = row["latency_ms"]["ask question"]
+        print(f"{row['sessions']:>8} {len(row['failures']):>6} {ask['p50']:>8.0f} {ask['p95']:>8.0f} {ask['p99']:>8.0f} "
+              f"{row['latency_ms']['create path']['p95']:>9.0f} {row['interactions_per_s']:>6.1f} "
+              f"{row['peak_rss_mib']:>9.0f} {row['per_session_kib']:>9.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate concurrent learners against app.py with the fake model")
+    parser.add_argument("--sessions", default="10", help="concurrent sessions, or a comma separated list to sweep")
+    parser.add_argument("--questions", type=int, default=2, help="questions each learner asks")
+    parser.add_argument("--feedback", choices=["quick", "detailed", "mixed"], default="mixed")
+    parser.add_argument("--latency", type=float, default=0.2, help="fake model seconds before replying")
+    parser.add_argument("--chunk-delay", type=float, default=0.01, help="fake model seconds between streamed chunks")
+    parser.add_argument("--think", type=float, default=0.5, help="most seconds a learner waits between interactions")
+    parser.add_argument("--ramp", type=float, default=2.0, help="seconds over which sessions start")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    counts = [int(count) for count in args.sessions.split(",")]
+    if len(counts) > 1:
+        sweep(counts, args)
+        return
+
+    args.sessions = counts[0]
+    with tempfile.TemporaryDirectory() as directory:
+        configure_environment(directory, args)
+        with concurrent_app_tests():
+            report = run_load(args)
+    if args.json:
+        print(json.dumps(report))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+import json
+import mmap
+import os
+import threading
+import zlib
+from collections import OrderedDict
+
+
+SHARDS = 16
+
+
+def _key_text(key):
+    return json.dumps(list(key))
+
+
+def _compress(data):
+    return zlib.compress(json.dumps(data, separators=(",", ":")).encode("utf-8"), 6)
+
+
+# One data file of compressed records and its index. The index is a JSON line per
+# path giving the offset and length of its header (subject, overview, module titles)
+# and of each module's details. Records are only ever appended and a path's index
+# line is written after its data, so readers never see half-written paths; a path
+# written again simply gets a newer index line.
+class _Shard:
+    def __init__(self, data_path, index_path):
+        self.data_path = data_path
+        self.index_path = index_path
+        self.index = {}
+        self._index_position = 0
+        self._map = None
+        self._lock = threading.Lock()
+
+    # Pick up index lines appended since the last look, e.g. by a running generator
+    def refresh(self):
+        with self._lock:
+            try:
+                if os.path.getsize(self.index_path) == self._index_position:
+                    return
+                with open(self.index_path, "rb") as f:
+                    f.seek(self._index_position)
+                    for line in f:
+                        if not line.endswith(b"\n"):
+                            break
+                        entry = json.loads(line)
+                        self.index[tuple(entry["key"])] = (entry["header"], entry["modules"])
+                        self._index_position += len(line)
+            except OSError:
+                pass
+
+    def read(self, offset, length):
+        with self._lock:
+            if self._map is None or offset + length > len(self._map):
+                # The file grew since it was mapped (or was never mapped), so map it again
+                if self._map is not None:
+                    self._map.close()
+                with open(self.data_path, "rb") as f:
+                    self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            return json.loads(zlib.decompress(self._map[offset:offset + length]))
+
+    def append(self, key, header, modules):
+        with self._lock:
+            with open(self.data_path, "ab") as f:
+                offset = f.tell()
+                spans = []
+                for blob in [header] + modules:
+                    f.write(blob)
+                    spans.append([offset, len(blob)])
+                    offset += len(blob)
+            line = json.dumps({"key": list(key), "header": spans[0], "modules": spans[1:]}) + "\n"
+            with open(self.index_path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+
+# Read-optimized store of pre-generated learning paths, keyed like the path cache
+# by normalized (subject, knowledge level, learning style). Paths are kept
+# compressed in memory-mapped shard files, so every session and process on the
+# machine shares one copy through the page cache. A path's outline and each of its
+# modules are compressed separately, so opening a module only decompresses that
+# module; recently used modules are kept decompressed in a small shared LRU.
+#
+# Entries never expire or get evicted. Only one process should write at a time.
+class ContentCatalog:
+    def __init__(self, directory, max_decompressed=256):
+        self.directory = directory
+        self.max_decompressed = max_decompressed
+        self._shards = [
+            _Shard(os.path.join(directory, f"shard-{i:02d}.dat"), os.path.join(directory, f"shard-{i:02d}.idx"))
+            for i in range(SHARDS)
+        ]
+        self._decompressed = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _shard(self, key):
+        shard = self._shards[zlib.crc32(_key_text(key).encode("utf-8")) % SHARDS]
+        shard.refresh()
+        return shard
+
+    def __contains__(self, key):
+        return tuple(key) in self._shard(key).index
+
+    def __len__(self):
+        for shard in self._shards:
+            shard.refresh()
+        return sum(len(shard.index) for shard in self._shards)
+
+    # The path with module titles and descriptions only; content, exercises and
+    # resources are None until read with module_details
+    def outline(self, key):
+        shard = self._shard(key)
+        entry = shard.index.get(tuple(key))
+        if entry is None:
+            return None
+        header = shard.read(*entry[0])
+        for module in header["modules"]:
+            module.update(content=None, exercises=None, additional_resources=None)
+        return header
+
+    def module_details(self, key, module_id):
+        cache_key = (tuple(key), module_id)
+        with self._lock:
+            if cache_key in self._decompressed:
+                self._decompressed.move_to_end(cache_key)
+                return self._decompressed[cache_key]
+
+        shard = self._shard(key)
+        entry = shard.index.get(tuple(key))
+        if entry is None or not 1 <= module_id <= len(entry[1]):
+            return None
+        details = shard.read(*entry[1][module_id - 1])
+
+        with self._lock:
+            self._decompressed[cache_key] = details
+            while len(self._decompressed) > self.max_decompressed:
+                self._decompressed.popitem(last=False)
+        return details
+
+    # The whole path, with every module decompressed
+    def get(self, key):
+        learning_path = self.outline(key)
+        if learning_path is None:
+            return None
+        for module in learning_path["modules"]:
+            module.update(self.module_details(key, module["id"]))
+        return learning_path
+
+    def put(self, key, learning_path):
+        os.makedirs(self.directory, exist_ok=True)
+        header = {
+            "subject": learning_path["subject"],
+            "overview": learning_path["overview"],
+            "modules": [
+                {"id": m["id"], "title": m["title"], "description": m["description"]}
+                for m in learning_path["modules"]
+            ],
+        }
+        modules = [
+            _compress({
+                "content": m["content"],
+                "exercises": m["exercises"],
+                "additional_resources": m["additional_resources"],
+            })
+            for m in learning_path["modules"]
+        ]
+        self._shard(key).append(tuple(key), _compress(header), modules)
+        with self._lock:
+            for cache_key in [k for k in self._decompressed if k[0] == tuple(key)]:
+                del self._decompressed[cache_key]
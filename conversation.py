@@ -0,0 +1,64 @@
+import threading
+
+from backends import estimate_tokens
+
+
+# Conversation with the assistant about one module, kept within a token budget.
+# Recent questions and answers are kept word for word. Once they outgrow the
+# budget, the oldest are folded into a rolling summary by summarize(summary,
+# turns) on a background executor; until that finishes they stay in the recent
+# turns, so nothing drops out of the context in the meantime. If summarizing
+# fails, the folded questions are appended to the summary instead. The summary is
+# capped as well, so the context stays the same size however long the
+# conversation runs.
+class ConversationMemory:
+    def __init__(self, token_budget=1500, summary_budget=300):
+        self.token_budget = token_budget
+        self.summary_budget = summary_budget
+        self.summary = ""
+        self.turns = []           # [(question, answer)], oldest first
+        self._folding = 0         # number of oldest turns being summarized
+        self._future = None
+        self._lock = threading.Lock()
+
+    def _tokens(self, turns):
+        return sum(estimate_tokens(question) + estimate_tokens(answer) for question, answer in turns)
+
+    def _cap(self, summary):
+        limit = self.summary_budget * 4
+        return summary if len(summary) <= limit else "..." + summary[-limit:]
+
+    # Take in a finished summary, if there is one
+    def _collect(self):
+        with self._lock:
+            if self._future is None or not self._future.done():
+                return
+            folded = self.turns[:self._folding]
+            try:
+                summary = self._future.result()
+            except Exception:
+                summary = " ".join([self.summary] + [f"The learner asked: {question}" for question, _ in folded])
+            self.summary = self._cap(summary.strip())
+            del self.turns[:self._folding]
+            self._folding = 0
+            self._future = None
+
+    # The rolling summary and recent turns to put in the next prompt
+    def context(self):
+        self._collect()
+        with self._lock:
+            return self.summary, list(self.turns)
+
+    def add(self, question, answer, summarize, executor):
+        self._collect()
+        with self._lock:
+            self.turns.append((question, answer))
+            if self._future is not None or self._tokens(self.turns) <= self.token_budget:
+                return
+            # Fold the oldest turns until the rest fit, always keeping the latest one
+            folding = 0
+            while folding < len(self.turns) - 1 and self._tokens(self.turns[folding:]) > self.token_budget:
+                folding += 1
+            if folding:
+                self._folding = folding
+                self._future = executor.submit(summarize, self.summary, self.turns[:folding])
@@ -0,0 +1,763 @@
+# The learning assistant without a user interface: creating learning paths,
+# preparing modules, explaining them, evaluating quiz answers, adaptive practice
+# and tracking progress. The Streamlit app and the JSON service (service.py) are
+# both thin clients of it.
+#
+# A LearningCore holds what every learner in the process shares: the model, the
+# caches, the store and the background pools. What belongs to one learner is
+# passed to each call as a state object with the attributes of LearnerState. The
+# service keeps a LearnerState per learner; the app passes st.session_state,
+# which has the same attributes. Nothing here renders anything: problems are
+# raised, and notices a UI may want to show go to the notify callback.
+import concurrent.futures
+import copy
+import functools
+import hashlib
+import json
+import os
+from datetime import datetime
+
+from answer_cache import AnswerCache
+from backends import LazyModel, create_model
+from catalog import ContentCatalog
+from conversation import ConversationMemory
+from learning_path import Exercise, LearningPath, PathProgress
+from metrics import InstrumentedModel, registry
+from path_cache import PathCache, normalize_path_key
+from path_parser import (
+    MODULE_DETAILS_SCHEMA, OUTLINE_SCHEMA, PRACTICE_QUESTIONS_SCHEMA,
+    IncrementalPathParser, parse_learning_path, parse_module_details, parse_practice_questions
+)
+from prefetch import ModulePrefetcher
+from prompts import LEARNING_PATH_CONFIG, learning_path_prompt
+from question_bank import QuestionBank
+from scheduler import ModelScheduler
+from singleflight import SingleFlight
+from storage import LearningStore, UnsavedStore
+
+# Outlines carry module titles and descriptions; each module's body is requested separately
+OUTLINE_CONFIG = {
+    "response_mime_type": "application/json",
+    "response_schema": OUTLINE_SCHEMA
+}
+
+MODULE_DETAILS_CONFIG = {
+    "response_mime_type": "application/json",
+    "response_schema": MODULE_DETAILS_SCHEMA
+}
+
+# Practice questions are written in batches, each tagged with the module it tests
+PRACTICE_QUESTIONS_CONFIG = {
+    "response_mime_type": "application/json",
+    "response_schema": PRACTICE_QUESTIONS_SCHEMA
+}
+
+# Ask for one feedback string per answer when a whole quiz is evaluated at once
+QUIZ_FEEDBACK_CONFIG = {
+    "response_mime_type": "application/json",
+    "response_schema": {"type": "ARRAY", "items": {"type": "STRING"}}
+}
+
+
+# Function to create the model every caller shares. Every call is traced into the
+# shared metrics registry, and queued, rate limited and retried by one scheduler so
+# interactive calls go ahead of bulk work. The backend itself is only created on
+# the first call or when prepare() is called on the returned model.
+def create_scheduled_model(backend, api_key):
+    return ModelScheduler(
+        InstrumentedModel(LazyModel(functools.partial(create_model, backend, api_key)), registry),
+        rpm=int(os.getenv("MODEL_RPM", "0")),
+        tpm=int(os.getenv("MODEL_TPM", "0")),
+        max_concurrency=int(os.getenv("MODEL_MAX_CONCURRENCY", "8")),
+        max_retries=int(os.getenv("MODEL_MAX_RETRIES", "4")),
+        registry=registry
+    )
+
+
+# One learner's profile and what they have open
+class LearnerState:
+    def __init__(self, user_name, knowledge_level="Beginner", learning_style="Visual"):
+        self.user_name = user_name
+        self.learner_id = user_name   # who the learner's paths and progress are stored under, None for nobody
+        self.knowledge_level = knowledge_level
+        self.learning_style = learning_style
+        self.learning_paths = {}      # subject -> LearningPath, loaded on first use
+        self.path_cache_keys = {}     # subject -> path cache key, or None
+        self.path_overviews = {}      # subject -> overview, for every saved path
+        self.progress = {}            # subject -> PathProgress
+        self.conversations = {}       # (subject, module id) -> ConversationMemory
+        self.question_banks = {}      # subject -> QuestionBank, loaded on first use
+        self.current_subject = None
+
+
+# Function to get the text of each chunk of a streamed response as it arrives
+def response_text_chunks(response):
+    for chunk in response:
+        try:
+            text = chunk.text
+        except ValueError:
+            # Chunks carrying only finish or safety information have no text
+            continue
+        if text:
+            yield text
+
+
+# Function to generate a module's content; it runs on the prefetch pool, so it must not touch learner state
+def generate_module_details(model, prompt):
+    response = model.generate_content(prompt, generation_config=MODULE_DETAILS_CONFIG)
+    details = parse_module_details(response.text)
+    if details is None:
+        registry.increment("parse_failures_total", caller="generate_module_details")
+        raise ValueError("the response did not contain usable module content")
+    return details
+
+
+# Function to get the key a module's generation is shared under. Learners on the same
+# cache key can have different outlines, so the prompt's digest is part of the key.
+def module_work_key(cache_key, module, prompt):
+    return cache_key, module.id, hashlib.sha256(prompt.encode()).hexdigest()
+
+
+# Function to fold earlier questions and answers into a conversation's summary; it
+# runs on the summary pool, so it must not touch learner state
+def summarize_conversation(model, subject, module_title, summary, turns):
+    exchanges = "\n\n".join(f"Q: {question}\nA: {answer}" for question, answer in turns)
+    prompt = f"""
+    Summarize this tutoring conversation about {subject}, module "{module_title}", in at most 150 words.
+    Keep what the learner asked about, what they found confusing and which examples were already used.
+
+    Summary so far: {summary or "(none)"}
+
+    New exchanges:
+    {exchanges}
+    """
+    return model.generate_content(prompt).text
+
+
+# Function to write a batch of practice questions; it runs on the practice pool, so it must not touch learner state
+def generate_practice_questions(model, prompt):
+    response = model.generate_content(prompt, generation_config=PRACTICE_QUESTIONS_CONFIG)
+    questions = parse_practice_questions(response.text)
+    if not questions:
+        registry.increment("parse_failures_total", caller="generate_practice_questions")
+        raise ValueError("the response did not contain usable practice questions")
+    return questions
+
+
+def _practice_row(question):
+    return (question.id, question.module_id, question.exercise.to_dict(),
+            question.attempts, question.correct, question.streak, question.due)
+
+
+# Stands in for the store for learners who are not saved
+UNSAVED = UnsavedStore()
+
+
+def _ignore(message):
+    pass
+
+
+class LearningCore:
+    def __init__(self, model, store, path_cache, catalog, answer_cache, prefetcher, path_flights=None,
+                 summary_executor=None, practice_executor=None):
+        self.model = model
+        self.store = store
+        self.path_cache = path_cache
+        self.catalog = catalog
+        self.answer_cache = answer_cache
+        self.prefetcher = prefetcher
+        # Identical path generations running at the same time share a single model call
+        self.path_flights = path_flights or SingleFlight()
+        # Folds older turns of module conversations into their summaries
+        self.summary_executor = summary_executor or concurrent.futures.ThreadPoolExecutor(
+            max_workers=2, thread_name_prefix="summarize"
+        )
+        # Writes practice questions ahead of time, before learners run out of them
+        self.practice_executor = practice_executor or concurrent.futures.ThreadPoolExecutor(
+            max_workers=2, thread_name_prefix="practice"
+        )
+
+    # Build everything from the same environment variables the app reads
+    @classmethod
+    def from_env(cls, model=None):
+        return cls(
+            model,
+            store=LearningStore(os.getenv("LEARNING_DB_FILE", os.path.join(".cache", "learning.db"))),
+            path_cache=PathCache(
+                os.getenv("PATH_CACHE_FILE", os.path.join(".cache", "learning_paths.json")),
+                max_entries=int(os.getenv("PATH_CACHE_MAX_ENTRIES", "500")),
+                ttl_seconds=float(os.getenv("PATH_CACHE_TTL_HOURS", "168")) * 3600
+            ),
+            catalog=ContentCatalog(os.getenv("CATALOG_DIR", os.path.join(".cache", "catalog"))),
+            answer_cache=AnswerCache(
+                threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.85")),
+                max_entries=int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "2000"))
+            ),
+            prefetcher=ModulePrefetcher(max_workers=int(os.getenv("PREFETCH_WORKERS", "4")))
+        )
+
+    # The same core with a different model, sharing all of its caches and pools
+    def with_model(self, model):
+        core = copy.copy(self)
+        core.model = model
+        return core
+
+    # Function to find a path that is ready without generating it: the pre-generated
+    # catalog first, then paths other learners have already generated. Catalog paths
+    # come back as an outline; their modules are read from the catalog when opened.
+    def find_ready_path(self, cache_key):
+        ready_path = self.catalog.outline(cache_key)
+        registry.increment("cache_lookups_total", cache="catalog", result="hit" if ready_path else "miss")
+        if ready_path is None:
+            ready_path = self.path_cache.get(cache_key)
+            registry.increment("cache_lookups_total", cache="learning_path", result="hit" if ready_path else "miss")
+        return ready_path
+
+    # Function to get where a learner reads module content from instead of holding it,
+    # which is the catalog for catalog paths and nowhere (None) for everything else
+    def module_source(self, cache_key):
+        if cache_key and cache_key in self.catalog:
+            return functools.partial(self.catalog.module_details, cache_key)
+        return None
+
+    # Where a learner's paths and progress go; learners without an id are kept in memory only
+    def store_for(self, state):
+        return self.store if state.learner_id else UNSAVED
+
+    # Function to start saving a learner who was kept in memory so far, with the paths,
+    # progress and practice questions they already have
+    def start_saving(self, state, learner_id):
+        state.learner_id = learner_id
+        for subject, path in state.learning_paths.items():
+            progress = state.progress[subject]
+            self.store.save_path(learner_id, subject, path.to_dict(), state.path_cache_keys[subject], progress.started)
+            for module_id in progress.completed:
+                self.store.complete_module(learner_id, subject, module_id, progress.current_module)
+            for module_id, score, date in progress.quiz_scores:
+                self.store.add_quiz_score(learner_id, subject, module_id, score, date)
+            if subject in state.question_banks:
+                questions = state.question_banks[subject].questions.values()
+                self.store.add_practice_questions(learner_id, subject, [_practice_row(q) for q in questions])
+
+    # Function to (re)load a learner's saved paths. Subjects, overviews and progress
+    # are read here; a full path is loaded when it is opened.
+    def load_learner(self, state):
+        state.learning_paths = {}
+        state.path_cache_keys = {}
+        state.conversations = {}
+        state.question_banks = {}
+        state.current_subject = None
+        state.path_overviews = dict(self.store_for(state).list_paths(state.learner_id))
+        # Progress is kept up to date in place from here on, so the store is only asked once
+        state.progress = {
+            entry["subject"]: PathProgress.from_report(entry)
+            for entry in self.store_for(state).progress_report(state.learner_id)
+        }
+
+    # Function to get a learning path, reading it from storage on first use
+    def load_learning_path(self, state, subject):
+        if subject not in state.learning_paths:
+            stored = self.store_for(state).load_path(state.learner_id, subject)
+            if stored is None:
+                return None
+            learning_path, cache_key = stored
+            state.learning_paths[subject] = LearningPath.from_dict(learning_path, self.module_source(cache_key))
+            state.path_cache_keys[subject] = cache_key
+        return state.learning_paths[subject]
+
+    # Function to store a learning path for the learner and start tracking progress on it
+    def save_learning_path(self, state, subject, learning_path, cache_key=None):
+        state.learning_paths[subject] = LearningPath.from_dict(learning_path, self.module_source(cache_key))
+        state.path_cache_keys[subject] = cache_key
+        state.path_overviews[subject] = learning_path["overview"]
+        state.question_banks.pop(subject, None)
+        state.current_subject = subject
+        started = datetime.now().strftime("%Y-%m-%d")
+        state.progress[subject] = PathProgress(subject, started, len(learning_path["modules"]))
+        self.store_for(state).save_path(state.learner_id, subject, learning_path, cache_key, started)
+
+    # Function to stream a response, handing each completed part of the path to on_update
+    def stream_learning_path(self, prompt, on_update, generation_config=LEARNING_PATH_CONFIG, caller="create_learning_path"):
+        response = self.model.generate_content(prompt, generation_config=generation_config, stream=True, caller=caller)
+        parser = IncrementalPathParser()
+        for text in response_text_chunks(response):
+            for field, value in parser.feed(text):
+                if field in ("overview", "module"):
+                    on_update(field, value)
+        return parser.buffer
+
+    # Function to generate and parse a path once for everyone asking for cache_key right now.
+    # Complete paths go into the shared cache before the flight ends, so later requests hit it.
+    def generate_shared_path(self, subject, cache_key, prompt, on_update, generation_config, outline=False):
+        def generate():
+            caller = "create_learning_path_outline" if outline else "create_learning_path"
+            if on_update:
+                content = self.stream_learning_path(prompt, on_update, generation_config, caller)
+            else:
+                response = self.model.generate_content(prompt, generation_config=generation_config, caller=caller)
+                content = response.text
+
+            learning_path, complete = parse_learning_path(content, outline=outline)
+            if not complete:
+                registry.increment("parse_failures_total", caller=caller)
+            if learning_path and not learning_path["subject"]:
+                learning_path["subject"] = subject
+            if learning_path and complete:
+                self.path_cache.put(cache_key, learning_path)
+            return learning_path, complete
+
+        (learning_path, complete), shared = self.path_flights.do(cache_key, generate)
+        if shared:
+            registry.increment("coalesced_generations_total", caller="create_learning_path_outline" if outline else "create_learning_path")
+        # Every learner gets their own copy, since each one goes on to edit their path
+        return copy.deepcopy(learning_path), complete
+
+    # Function to create a new learning path with improved JSON handling
+    def create_learning_path(self, state, subject, on_update=None, notify=_ignore):
+        if self.model is None:
+            return None
+
+        # Paths only depend on subject, level and style, so reuse one another learner already paid for
+        cache_key = normalize_path_key(subject, state.knowledge_level, state.learning_style)
+        ready_path = self.find_ready_path(cache_key)
+        if ready_path:
+            self.save_learning_path(state, subject, ready_path, cache_key)
+            return ready_path
+
+        prompt = learning_path_prompt(subject, state.knowledge_level, state.learning_style)
+
+        # Validate the response, keeping whatever complete modules survive a broken or truncated reply
+        learning_path, complete = self.generate_shared_path(subject, cache_key, prompt, on_update, LEARNING_PATH_CONFIG)
+        if learning_path is None:
+            # Nothing usable came back, so as a last resort try a different prompt for simpler JSON
+            notify("Trying alternative approach...")
+            registry.increment("fallbacks_total", caller="create_learning_path")
+            return self.create_simpler_learning_path(state, subject)
+        self.save_learning_path(state, subject, learning_path, cache_key)
+        if not complete:
+            notify(f"The response was incomplete, so only {len(learning_path['modules'])} modules were kept.")
+        return learning_path
+
+    # Function to create a learning path outline whose module content is generated on demand
+    def create_learning_path_outline(self, state, subject, on_update=None):
+        if self.model is None:
+            return None
+
+        # A fully generated path is as good as an outline, so check for either one
+        cache_key = normalize_path_key(subject, state.knowledge_level, state.learning_style)
+        outline_key = cache_key + ("outline",)
+        for key in (cache_key, outline_key):
+            ready_path = self.find_ready_path(key)
+            if ready_path:
+                self.save_learning_path(state, subject, ready_path, key)
+                self.prefetch_module(state, subject, 1)
+                return ready_path
+
+        prompt = f"""
+    Create the outline of a learning path for teaching {subject} to a {state.knowledge_level.lower()} level student
+    who prefers {state.learning_style} learning style.
+
+    Return the subject, a brief overview of what they will learn, and the list of modules with an id, a title
+    and a short description for each. Do not write the module content or exercises yet.
+
+    Include 5-7 modules with gradually increasing complexity.
+    """
+
+        learning_path, complete = self.generate_shared_path(subject, outline_key, prompt, on_update, OUTLINE_CONFIG, outline=True)
+        if learning_path is None:
+            raise ValueError("no usable learning path outline came back, please try again")
+        self.save_learning_path(state, subject, learning_path, outline_key)
+
+        # Start on the first module right away so it is ready when the learner opens it
+        self.prefetch_module(state, subject, 1)
+        return learning_path
+
+    # Fallback function for creating a simpler learning path
+    def create_simpler_learning_path(self, state, subject):
+        if self.model is None:
+            return None
+
+        prompt = f"""
+    Create a simple learning path for {subject} at {state.knowledge_level.lower()} level.
+
+    Return ONLY a valid JSON object with this exact structure:
+    {{
+        "subject": "subject name",
+        "overview": "brief overview",
+        "modules": [
+            {{
+                "id": 1,
+                "title": "title1",
+                "description": "description1",
+                "content": "content1",
+                "exercises": [
+                    {{
+                        "question": "question1",
+                        "options": ["opt1", "opt2", "opt3", "opt4"],
+                        "answer": "opt1",
+                        "explanation": "explanation1"
+                    }}
+                ],
+                "additional_resources": ["res1", "res2"]
+            }}
+        ]
+    }}
+
+    Include 3 modules with 2 exercises each. No markdown formatting in your response.
+    """
+
+        response = self.model.generate_content(prompt, generation_config=LEARNING_PATH_CONFIG)
+        learning_path, complete = parse_learning_path(response.text)
+        if not complete:
+            registry.increment("parse_failures_total", caller="create_simpler_learning_path")
+        if learning_path is None:
+            raise ValueError("the response did not contain a usable learning path")
+
+        self.save_learning_path(state, subject, learning_path)
+        return learning_path
+
+    # Function to build the prompt for the content and exercises of one outline module
+    def module_details_prompt(self, path, module, cache_key):
+        _, knowledge_level, learning_style = cache_key[:3]
+        titles = "\n".join(f"    {m.id}. {m.title}" for m in path.modules)
+        return f"""
+    You are writing one module of a learning path on {path.subject} for a {knowledge_level} level student
+    who prefers {learning_style} learning style.
+
+    Overview of the learning path: {path.overview}
+
+    Modules in the learning path:
+{titles}
+
+    Write module {module.id}: "{module.title}" - {module.description}
+
+    Provide detailed learning content formatted for {learning_style} learners, 3-5 multiple choice exercises
+    (each with options, the correct option as the answer, and a detailed explanation) and a few additional resources.
+    """
+
+    # Function to start generating a module's content in the background if it still needs it
+    def prefetch_module(self, state, subject, module_id):
+        path = state.learning_paths[subject]
+        module = path.module(module_id)
+        if self.model is None or module is None:
+            return
+
+        if module.content is None:
+            cache_key = state.path_cache_keys[subject]
+            prompt = self.module_details_prompt(path, module, cache_key)
+            self.prefetcher.submit(module_work_key(cache_key, module, prompt), generate_module_details, self.model, prompt)
+
+    # Function to make sure a module has its content and exercises, waiting for them if needed
+    def load_module(self, state, subject, module):
+        if module.content is None:
+            if self.model is None:
+                raise ValueError("please configure the API key first")
+
+            path = state.learning_paths[subject]
+            cache_key = state.path_cache_keys[subject]
+            prompt = self.module_details_prompt(path, module, cache_key)
+            details = self.prefetcher.result(
+                module_work_key(cache_key, module, prompt), generate_module_details, self.model, prompt
+            )
+            module.set_details(details)
+            self.store_for(state).update_module(state.learner_id, subject, module.to_dict())
+
+            # Share the module with every other learner on the same outline. The cached
+            # outline can differ from this learner's (e.g. after it was evicted and
+            # regenerated), so only fill in the module if it is the same one.
+            self.path_cache.update_module(cache_key, module.id, module.title, module.description, details)
+
+        # Have the next module ready by the time the learner gets to it
+        self.prefetch_module(state, subject, module.id + 1)
+
+    # Function to get the learner's conversation memory for a module
+    def get_conversation(self, state, subject, module_id):
+        if (subject, module_id) not in state.conversations:
+            state.conversations[(subject, module_id)] = ConversationMemory(
+                token_budget=int(os.getenv("CONVERSATION_TOKEN_BUDGET", "1500")),
+                summary_budget=int(os.getenv("CONVERSATION_SUMMARY_TOKENS", "300"))
+            )
+        return state.conversations[(subject, module_id)]
+
+    # Function to generate AI response for questions, yielding the text as it is generated
+    def get_ai_explanation(self, state, question, subject, module):
+        if self.model is None:
+            yield "Please configure the API key first."
+            return
+
+        conversation = self.get_conversation(state, subject, module.id)
+        summary, turns = conversation.context()
+        summarize = functools.partial(summarize_conversation, self.model, subject, module.title)
+
+        # Learners in the same module, level and style keep asking the same things, but
+        # a follow-up only makes sense within its own conversation
+        scope = normalize_path_key(subject, state.knowledge_level, state.learning_style) + (module.title,)
+        if not turns and not summary:
+            cached_answer = self.answer_cache.get(scope, question)
+            registry.increment("cache_lookups_total", cache="explanation", result="hit" if cached_answer else "miss")
+            if cached_answer:
+                conversation.add(question, cached_answer, summarize, self.summary_executor)
+                yield cached_answer
+                return
+
+        # The module content comes first and is the same for every question in the
+        # module, so backends that cache prompt prefixes only process it once
+        excerpt_limit = int(os.getenv("MODULE_CONTEXT_TOKENS", "2000")) * 4
+        excerpt = (module.content or module.description)[:excerpt_limit]
+        history = ""
+        if summary:
+            history += f"\n    Summary of the conversation so far: {summary}\n"
+        if turns:
+            history += "\n    Recent questions and answers:\n" + "\n".join(
+                f"    Q: {q}\n    A: {a}" for q, a in turns
+            ) + "\n"
+
+        # Answers are shared through the cache, so nothing about the learner beyond
+        # the cache scope (level and style) goes into the prompt
+        prompt = f"""
+    Module content:
+    {excerpt}
+
+    The user is learning about {subject}, specifically in the module: {module.title}.
+    They have a {state.knowledge_level.lower()} knowledge level and prefer {state.learning_style} learning style.
+    {history}
+    Their question is: "{question}"
+
+    Please provide a helpful, detailed explanation that:
+    1. Directly answers their question
+    2. Uses examples and explanations suitable for {state.learning_style} learners
+    3. Connects to the broader context of {subject}
+    4. Is appropriate for someone at {state.knowledge_level.lower()} level
+    """
+
+        try:
+            parts = []
+            for text in response_text_chunks(self.model.generate_content(prompt, stream=True)):
+                parts.append(text)
+                yield text
+            # Only complete answers are remembered, and only standalone ones are cached
+            answer = "".join(parts)
+            if not turns and not summary:
+                self.answer_cache.put(scope, question, answer)
+            conversation.add(question, answer, summarize, self.summary_executor)
+        except Exception as e:
+            yield f"\n\nError generating explanation: {e}"
+
+    # Function to build the prompt for evaluating a single quiz answer
+    def quiz_answer_prompt(self, state, user_answer, correct_answer, question, subject, module):
+        return f"""
+    Evaluate the user's answer to the following question about {subject} from module "{module}".
+
+    Question: {question}
+    Correct answer: {correct_answer}
+    User's answer: {user_answer}
+
+    Provide:
+    1. Whether the answer is correct, partially correct, or incorrect
+    2. A detailed explanation of why
+    3. Additional insights or tips to help the user understand better
+    4. Explain any misconceptions if present
+
+    Remember the user is at {state.knowledge_level.lower()} level and prefers {state.learning_style} learning style.
+    """
+
+    # Function to evaluate quiz answers, yielding the feedback as it is generated
+    def evaluate_quiz_answer(self, state, user_answer, correct_answer, question, subject, module):
+        if self.model is None:
+            yield "Please configure the API key first."
+            return
+
+        prompt = self.quiz_answer_prompt(state, user_answer, correct_answer, question, subject, module)
+
+        try:
+            yield from response_text_chunks(self.model.generate_content(prompt, stream=True))
+        except Exception as e:
+            yield f"\n\nError evaluating answer: {e}"
+
+    # Function to evaluate a quiz answer without blocking other evaluations. The prompt
+    # is built right away, on the caller's thread; the returned coroutine only calls the model.
+    def evaluate_quiz_answer_async(self, state, user_answer, correct_answer, question, subject, module):
+        prompt = self.quiz_answer_prompt(state, user_answer, correct_answer, question, subject, module)
+        return self._evaluate_async(prompt)
+
+    async def _evaluate_async(self, prompt):
+        if self.model is None:
+            return "Please configure the API key first."
+        try:
+            response = await self.model.generate_content_async(prompt, caller="evaluate_quiz_answer")
+            return response.text
+        except Exception as e:
+            return f"Error evaluating answer: {e}"
+
+    # Function to evaluate every answer of a finished quiz in a single request
+    def evaluate_quiz_batch(self, state, responses, subject, module):
+        if self.model is None:
+            return ["Please configure the API key first."] * len(responses)
+
+        answers = "\n".join(
+            f"""
+    Answer {i + 1}
+    Question: {response['question']}
+    Correct answer: {response['correct_answer']}
+    User's answer: {response['user_answer']}
+    Graded as: {"correct" if response['is_correct'] else "incorrect"}"""
+            for i, response in enumerate(responses)
+        )
+
+        prompt = f"""
+    Evaluate the user's answers to the following quiz about {subject} from module "{module}".
+    {answers}
+
+    For each answer provide:
+    1. A detailed explanation of why it is correct or incorrect
+    2. Additional insights or tips to help the user understand better
+    3. Explain any misconceptions if present
+
+    Return a JSON array with exactly {len(responses)} markdown strings, one per answer, in the same order.
+    Remember the user is at {state.knowledge_level.lower()} level and prefers {state.learning_style} learning style.
+    """
+
+        try:
+            response = self.model.generate_content(prompt, generation_config=QUIZ_FEEDBACK_CONFIG)
+            try:
+                feedback = [str(item) for item in json.loads(response.text)]
+            except ValueError:
+                registry.increment("parse_failures_total", caller="evaluate_quiz_batch")
+                raise
+            # Never leave an answer without feedback if the model returned too few items
+            return (feedback + ["No feedback was generated for this answer."] * len(responses))[:len(responses)]
+        except Exception as e:
+            return [f"Error evaluating answers: {e}"] * len(responses)
+
+    # Function to mark a module as complete
+    def complete_module(self, state, subject, module_id):
+        progress = state.progress.get(subject)
+        if progress:
+            path = self.load_learning_path(state, subject)
+            progress.complete(module_id, path.module(module_id).title)
+
+            # Set the next module as current
+            next_module = module_id + 1
+            if path.module(next_module):
+                progress.current_module = next_module
+            else:
+                progress.current_module = module_id
+
+            self.store_for(state).complete_module(state.learner_id, subject, module_id, progress.current_module)
+        return progress
+
+    # Function to record a finished quiz's score
+    def add_quiz_score(self, state, subject, module_id, score, date=None):
+        date = date or datetime.now().strftime("%Y-%m-%d %H:%M")
+        progress = state.progress.get(subject)
+        if progress:
+            path = self.load_learning_path(state, subject)
+            progress.add_quiz_score(module_id, path.module(module_id).title, score, date)
+            if subject in state.question_banks:
+                state.question_banks[subject].set_module_scores(progress.module_scores)
+        self.store_for(state).add_quiz_score(state.learner_id, subject, module_id, score, date)
+        return progress
+
+    # Function to get the learner's practice question bank for a path, loading it on first
+    # use. It holds the exercises of every module the learner has opened, and the questions
+    # written in the background since the last call join it here.
+    def get_question_bank(self, state, subject):
+        path = self.load_learning_path(state, subject)
+        if path is None:
+            return None
+
+        bank = state.question_banks.get(subject)
+        if bank is None:
+            bank = QuestionBank(low_water=int(os.getenv("PRACTICE_LOW_WATER", "5")))
+            saved = self.store_for(state).load_practice_questions(state.learner_id, subject)
+            for question_id, module_id, exercise, *results in saved:
+                bank.restore(question_id, module_id, Exercise.from_dict(exercise), *results)
+            progress = state.progress.get(subject)
+            if progress:
+                bank.set_module_scores(progress.module_scores)
+            state.question_banks[subject] = bank
+
+        added = []
+        for module in path.modules:
+            if module.id in bank.seeded:
+                continue
+            exercises = module.exercises
+            if exercises is not None:
+                bank.seeded.add(module.id)
+                added += [question for question in (bank.add(module.id, e) for e in exercises) if question]
+        added += bank.collect()
+        if added:
+            self.store_for(state).add_practice_questions(state.learner_id, subject, [_practice_row(q) for q in added])
+        return bank
+
+    # Function to build the prompt for a batch of practice questions on the learner's weakest modules
+    def practice_questions_prompt(self, state, path, module_ids, asked):
+        batch_size = int(os.getenv("PRACTICE_BATCH_SIZE", "10"))
+        modules = "\n".join(
+            f"    Module {m.id}: {m.title} - {m.description}" for m in map(path.module, module_ids)
+        )
+        already_asked = "\n".join(f"    - {question}" for question in asked) or "    (none yet)"
+        return f"""
+    Write {batch_size} new multiple choice practice questions for a learning path on {path.subject} for a
+    {state.knowledge_level.lower()} level student who prefers {state.learning_style} learning style.
+
+    Focus on these modules, where the student is weakest (weakest first):
+{modules}
+
+    The student has already practised these questions, so do not repeat them:
+{already_asked}
+
+    Give each question the id of the module it tests as module_id, 4 options, the correct option as the
+    answer, and a detailed explanation.
+    """
+
+    # Function to start writing more practice questions in the background once the learner
+    # is running out of new ones, so the next question never waits for the model
+    def top_up_question_bank(self, state, subject, bank):
+        if self.model is None or not bank.seeded or not bank.running_low():
+            return
+        module_ids = bank.weakest_modules(3)
+        prompt = self.practice_questions_prompt(
+            state, state.learning_paths[subject], module_ids, bank.questions_on(module_ids, 30)
+        )
+        bank.refill(self.practice_executor, generate_practice_questions, self.model, prompt)
+
+    # Function to pick the question the learner should practise next, or None until
+    # they have opened a module
+    def next_practice_question(self, state, subject):
+        bank = self.get_question_bank(state, subject)
+        if bank is None:
+            return None
+        self.top_up_question_bank(state, subject, bank)
+        return bank.next()
+
+    # Function to record the learner's result on a practice question and schedule its next review
+    def record_practice_result(self, state, subject, question, correct):
+        bank = state.question_banks[subject]
+        bank.record(question.id, correct)
+        self.store_for(state).update_practice_question(
+            state.learner_id, subject, question.id, question.attempts, question.correct, question.streak, question.due
+        )
+        self.top_up_question_bank(state, subject, bank)
+
+    # Function to grade an answer to a practice question locally. Returns the question, or
+    # None if the bank has no such question, and whether the answer was correct.
+    def answer_practice_question(self, state, subject, question_id, answer):
+        bank = self.get_question_bank(state, subject)
+        question = bank.questions.get(question_id) if bank else None
+        if question is None:
+            return None, False
+        correct = answer == question.exercise.answer
+        self.record_practice_result(state, subject, question, correct)
+        return question, correct
+
+    # Function to count an answer from a module quiz towards the practice question bank
+    def record_exercise_result(self, state, subject, module_id, exercise, correct):
+        bank = self.get_question_bank(state, subject)
+        if bank is None:
+            return
+        question = bank.find(exercise.question)
+        if question is None:
+            question = bank.add(module_id, exercise)
+            self.store_for(state).add_practice_questions(state.learner_id, subject, [_practice_row(question)])
+        self.record_practice_result(state, subject, question, correct)
@@ -0,0 +1,250 @@
+# Compact in-memory form of the learning paths and progress a session works with.
+# Parsed JSON is turned into these objects once, when a path enters the session,
+# so reruns read attributes and indexes instead of searching and relabelling dicts.
+# The dict form is still what the model, the path cache and the store exchange.
+#
+# A path can also be a handle on shared content: given a source, modules that
+# came without content read it from the source whenever it is needed instead of
+# keeping their own copy. Module content a session does hold is interned in the
+# process-wide content_pool, so sessions on the same path share one copy of it.
+import hashlib
+import json
+import threading
+import weakref
+
+
+class Exercise:
+    __slots__ = ("question", "options", "answer", "explanation")
+
+    def __init__(self, question, options, answer, explanation=""):
+        self.question = question
+        self.options = options
+        self.answer = answer
+        self.explanation = explanation
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["question"], tuple(data.get("options") or ()), data["answer"], data.get("explanation", ""))
+
+    def to_dict(self):
+        return {
+            "question": self.question,
+            "options": list(self.options),
+            "answer": self.answer,
+            "explanation": self.explanation,
+        }
+
+
+def _exercises(exercises):
+    return None if exercises is None else tuple(Exercise.from_dict(e) for e in exercises)
+
+
+# The content, exercises and resources of a module, shared by every session
+# holding a module with the same content. Treat it as read-only.
+class ModuleContent:
+    __slots__ = ("content", "exercises", "additional_resources")
+
+    def __init__(self, content, exercises, additional_resources):
+        self.content = content
+        self.exercises = exercises
+        self.additional_resources = additional_resources
+
+
+# Process-wide store of module content keyed by a hash of the content itself.
+# Every module holding an entry counts as a reference; the entry is dropped when
+# the last one is released, which happens when the module is garbage collected
+# (e.g. its session ends) or given new content.
+class ContentPool:
+    def __init__(self):
+        self._entries = {}    # digest -> [ModuleContent, references, size in bytes as JSON]
+        self._lock = threading.Lock()
+
+    # Returns (digest, shared ModuleContent) and takes a reference on it
+    def intern(self, content, exercises, additional_resources):
+        data = json.dumps([content, exercises, additional_resources], separators=(",", ":")).encode("utf-8")
+        digest = hashlib.blake2b(data, digest_size=16).digest()
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                entry = [ModuleContent(content, _exercises(exercises), tuple(additional_resources or ())), 0, len(data)]
+                self._entries[digest] = entry
+            entry[1] += 1
+            return digest, entry[0]
+
+    def release(self, digest):
+        with self._lock:
+            entry = self._entries[digest]
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._entries[digest]
+
+    # How much module content is held and how much interning saved
+    def report(self):
+        with self._lock:
+            entries = list(self._entries.values())
+        unique_bytes = sum(size for _, _, size in entries)
+        referenced_bytes = sum(size * references for _, references, size in entries)
+        return {
+            "entries": len(entries),
+            "references": sum(references for _, references, _ in entries),
+            "unique_bytes": unique_bytes,
+            "referenced_bytes": referenced_bytes,
+            "saved_bytes": referenced_bytes - unique_bytes,
+        }
+
+
+content_pool = ContentPool()
+
+
+class Module:
+    __slots__ = ("id", "title", "description", "label", "_shared_content", "_release", "_source", "__weakref__")
+
+    # source(module_id) returns the module's details as a dict, or None
+    def __init__(self, module_id, title, description, source=None):
+        self.id = module_id
+        self.title = title
+        self.description = description
+        self.label = f"Module {module_id}: {title}"
+        self._shared_content = None
+        self._release = None
+        self._source = source
+
+    @classmethod
+    def from_dict(cls, data, source=None):
+        module = cls(data["id"], data["title"], data["description"], source)
+        module.set_details(data)
+        return module
+
+    # Fill in the content, exercises and resources of an outline module once they are generated
+    def set_details(self, details):
+        if self._release is not None:
+            self._release()
+            self._shared_content = self._release = None
+        if details.get("content") is None:
+            return
+        digest, self._shared_content = content_pool.intern(
+            details["content"], details.get("exercises"), details.get("additional_resources")
+        )
+        self._release = weakref.finalize(self, content_pool.release, digest)
+
+    def _from_source(self):
+        if self._shared_content is not None or self._source is None:
+            return None
+        return self._source(self.id)
+
+    @property
+    def content(self):
+        details = self._from_source()
+        if details is not None:
+            return details["content"]
+        return self._shared_content.content if self._shared_content else None
+
+    @property
+    def exercises(self):
+        details = self._from_source()
+        if details is not None:
+            return _exercises(details["exercises"])
+        return self._shared_content.exercises if self._shared_content else None
+
+    @property
+    def additional_resources(self):
+        details = self._from_source()
+        if details is not None:
+            return tuple(details["additional_resources"] or ())
+        return self._shared_content.additional_resources if self._shared_content else ()
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "title": self.title,
+            "description": self.description,
+            "content": self.content,
+            "exercises": None if self.exercises is None else [e.to_dict() for e in self.exercises],
+            "additional_resources": list(self.additional_resources),
+        }
+
+
+class LearningPath:
+    __slots__ = ("subject", "overview", "modules", "_by_id")
+
+    def __init__(self, subject, overview, modules):
+        self.subject = subject
+        self.overview = overview
+        self.modules = tuple(modules)
+        self._by_id = {module.id: module for module in self.modules}
+        if len(self._by_id) != len(self.modules):
+            raise ValueError("module ids must be unique")
+
+    @classmethod
+    def from_dict(cls, data, source=None):
+        return cls(data["subject"], data["overview"], (Module.from_dict(m, source) for m in data["modules"]))
+
+    def module(self, module_id):
+        return self._by_id.get(module_id)
+
+    def to_dict(self):
+        return {"subject": self.subject, "overview": self.overview, "modules": [m.to_dict() for m in self.modules]}
+
+
+# Progress on one path, in the shape the Progress tab shows it. The completed
+# module list and quiz history are kept as the text that is rendered, and are
+# appended to as modules are completed and quizzes are taken. The scores are kept
+# as well: the latest of each module for adaptive practice, and all of them so a
+# learner's progress can be saved after the fact.
+class PathProgress:
+    __slots__ = ("subject", "started", "total_modules", "current_module", "completed",
+                 "completed_text", "quiz_count", "quiz_text", "quiz_scores", "module_scores")
+
+    def __init__(self, subject, started, total_modules, current_module=0):
+        self.subject = subject
+        self.started = started
+        self.total_modules = total_modules
+        self.current_module = current_module
+        self.completed = {}    # module id -> title, in completion order
+        self.completed_text = ""
+        self.quiz_count = 0
+        self.quiz_text = ""
+        self.quiz_scores = []      # (module id, score, date), oldest first
+        self.module_scores = {}    # module id -> latest quiz score
+
+    # Build from one entry of LearningStore.progress_report
+    @classmethod
+    def from_report(cls, entry):
+        progress = cls(entry["subject"], entry["started"], entry["total_modules"], entry["current_module"])
+        progress.completed = dict(entry["completed"])
+        progress.completed_text = "  \n".join(_completed_line(*row) for row in entry["completed"])
+        progress.quiz_count = len(entry["quiz_scores"])
+        progress.quiz_text = "  \n".join(_quiz_line(*row) for row in entry["quiz_scores"])
+        progress.quiz_scores = [(module_id, score, date) for module_id, _, score, date in entry["quiz_scores"]]
+        progress.module_scores = {module_id: score for module_id, _, score, _ in entry["quiz_scores"]}
+        return progress
+
+    @property
+    def percent(self):
+        return len(self.completed) / self.total_modules * 100 if self.total_modules else 0.0
+
+    # Returns False if the module was already complete
+    def complete(self, module_id, title):
+        if module_id in self.completed:
+            return False
+        self.completed[module_id] = title
+        self.completed_text = _append_line(self.completed_text, _completed_line(module_id, title))
+        return True
+
+    def add_quiz_score(self, module_id, title, score, date):
+        self.quiz_count += 1
+        self.quiz_text = _append_line(self.quiz_text, _quiz_line(module_id, title, score, date))
+        self.quiz_scores.append((module_id, score, date))
+        self.module_scores[module_id] = score
+
+
+def _completed_line(module_id, title):
+    return f"✓ Module {module_id}: {title}"
+
+
+def _quiz_line(module_id, title, score, date):
+    return f"Module {module_id} ({title}): {score:.1f}% on {date}"
+
+
+def _append_line(text, line):
+    return f"{text}  \n{line}" if text else line
@@ -0,0 +1,227 @@
+import os
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def _quantile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in sorted(labels.items())) + "}"
+
+
+# Process-wide record of model calls and app events. Durations keep a bounded
+# window of recent samples per call type for percentiles; counters and token
+# totals grow for the life of the process.
+class MetricsRegistry:
+    def __init__(self, window=2048):
+        self.window = window
+        self._durations = defaultdict(lambda: deque(maxlen=self.window))
+        self._first_token = defaultdict(lambda: deque(maxlen=self.window))
+        self._totals = defaultdict(float)    # (metric, caller) -> running total
+        self._counters = defaultdict(int)    # (name, sorted labels) -> count
+        self._lock = threading.Lock()
+
+    def record_call(self, caller, duration, first_token, prompt_tokens, output_tokens, error=False):
+        with self._lock:
+            self._durations[caller].append(duration)
+            self._first_token[caller].append(first_token)
+            self._totals[("calls", caller)] += 1
+            self._totals[("seconds", caller)] += duration
+            self._totals[("prompt_tokens", caller)] += prompt_tokens
+            self._totals[("output_tokens", caller)] += output_tokens
+            if error:
+                self._totals[("errors", caller)] += 1
+
+    def increment(self, name, **labels):
+        with self._lock:
+            self._counters[(name, tuple(sorted(labels.items())))] += 1
+
+    def summary(self):
+        with self._lock:
+            callers = sorted(self._durations)
+            rows = []
+            for caller in callers:
+                durations = sorted(self._durations[caller])
+                first_token = sorted(self._first_token[caller])
+                row = {
+                    "caller": caller,
+                    "calls": int(self._totals[("calls", caller)]),
+                    "errors": int(self._totals[("errors", caller)]),
+                    "prompt_tokens": int(self._totals[("prompt_tokens", caller)]),
+                    "output_tokens": int(self._totals[("output_tokens", caller)]),
+                    "ttft_p50": _quantile(first_token, 0.5),
+                }
+                for q in QUANTILES:
+                    row[f"p{int(q * 100)}"] = _quantile(durations, q)
+                rows.append(row)
+            counters = [(name, dict(labels), count) for (name, labels), count in sorted(self._counters.items())]
+            return rows, counters
+
+    # Render every metric in the Prometheus text exposition format
+    def prometheus_text(self):
+        rows, counters = self.summary()
+        with self._lock:
+            seconds = {row["caller"]: self._totals[("seconds", row["caller"])] for row in rows}
+
+        lines = [
+            "# HELP learn_model_call_seconds Wall time of model calls.",
+            "# TYPE learn_model_call_seconds summary",
+        ]
+        for row in rows:
+            for q in QUANTILES:
+                labels = _labels({"caller": row["caller"], "quantile": q})
+                lines.append(f"learn_model_call_seconds{labels} {row[f'p{int(q * 100)}']:.6f}")
+            lines.append(f"learn_model_call_seconds_sum{_labels({'caller': row['caller']})} {seconds[row['caller']]:.6f}")
+            lines.append(f"learn_model_call_seconds_count{_labels({'caller': row['caller']})} {row['calls']}")
+
+        for metric, key, help_text in (
+            ("learn_model_time_to_first_token_seconds", "ttft_p50", "Median time to the first response chunk."),
+            ("learn_model_errors_total", "errors", "Model calls that raised an error."),
+            ("learn_model_prompt_tokens_total", "prompt_tokens", "Prompt tokens sent to the model."),
+            ("learn_model_output_tokens_total", "output_tokens", "Output tokens generated by the model."),
+        ):
+            metric_type = "gauge" if key == "ttft_p50" else "counter"
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {metric_type}")
+            for row in rows:
+                lines.append(f"{metric}{_labels({'caller': row['caller']})} {row[key]}")
+
+        seen = set()
+        for name, labels, count in counters:
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# TYPE learn_{name} counter")
+            lines.append(f"learn_{name}{_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+def _usage_counts(response):
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return 0, 0
+    return getattr(usage, "prompt_token_count", 0) or 0, getattr(usage, "candidates_token_count", 0) or 0
+
+
+# Wraps a streamed response so timing and token usage are recorded once it has been read
+class _TracedStream:
+    def __init__(self, response, registry, caller, started):
+        self._response = response
+        self._registry = registry
+        self._caller = caller
+        self._started = started
+
+    def __iter__(self):
+        first_token = None
+        try:
+            for chunk in self._response:
+                if first_token is None:
+                    first_token = time.perf_counter() - self._started
+                yield chunk
+        except Exception:
+            duration = time.perf_counter() - self._started
+            self._registry.record_call(self._caller, duration, first_token or duration, 0, 0, error=True)
+            raise
+        duration = time.perf_counter() - self._started
+        prompt_tokens, output_tokens = _usage_counts(self._response)
+        self._registry.record_call(self._caller, duration, first_token or duration, prompt_tokens, output_tokens)
+
+    def __getattr__(self, name):
+        return getattr(self._response, name)
+
+
+# Model wrapper that traces every call. The call type is the name of the calling
+# function unless it is passed explicitly as caller=.
+class InstrumentedModel:
+    def __init__(self, model, registry):
+        self.model = model
+        self.registry = registry
+
+    def generate_content(self, prompt, *args, caller=None, stream=False, **kwargs):
+        caller = caller or sys._getframe(1).f_code.co_name
+        started = time.perf_counter()
+        try:
+            response = self.model.generate_content(prompt, *args, stream=stream, **kwargs)
+        except Exception:
+            duration = time.perf_counter() - started
+            self.registry.record_call(caller, duration, duration, 0, 0, error=True)
+            raise
+
+        if stream:
+            return _TracedStream(response, self.registry, caller, started)
+
+        duration = time.perf_counter() - started
+        self.registry.record_call(caller, duration, duration, *_usage_counts(response))
+        return response
+
+    async def generate_content_async(self, prompt, *args, caller=None, **kwargs):
+        caller = caller or sys._getframe(1).f_code.co_name
+        started = time.perf_counter()
+        try:
+            response = await self.model.generate_content_async(prompt, *args, **kwargs)
+        except Exception:
+            duration = time.perf_counter() - started
+            self.registry.record_call(caller, duration, duration, 0, 0, error=True)
+            raise
+
+        duration = time.perf_counter() - started
+        self.registry.record_call(caller, duration, duration, *_usage_counts(response))
+        return response
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+
+# Serve the registry at http://<host>:<port>/metrics from a background thread
+def start_http_exporter(registry, port, host="127.0.0.1"):
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.prometheus_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+# Rewrite a Prometheus text file (e.g. for node_exporter's textfile collector) every interval seconds
+def start_file_exporter(registry, file_path, interval=15.0):
+    def export():
+        while True:
+            tmp_path = f"{file_path}.tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    f.write(registry.prometheus_text())
+                os.replace(tmp_path, file_path)
+            except OSError:
+                pass
+            time.sleep(interval)
+
+    thread = threading.Thread(target=export, name="metrics-file", daemon=True)
+    thread.start()
+    return thread
+
+
+# The registry shared by the app, its background workers and the admin page
+registry = MetricsRegistry()
@@ -0,0 +1,56 @@
+import streamlit as st
+from learning_path import content_pool
+from metrics import registry
+
+# Admin page: latency percentiles, token usage and cache/parse counters for this server process
+st.set_page_config(page_title="Model Metrics", layout="wide")
+
+st.title("📈 Model Call Metrics")
+st.markdown("Collected since this server process started. Latencies are over the most recent calls of each type.")
+
+rows, counters = registry.summary()
+
+if rows:
+    st.subheader("Model Calls")
+    st.dataframe(
+        [
+            {
+                "Call type": row["caller"],
+                "Calls": row["calls"],
+                "Errors": row["errors"],
+                "p50 (s)": round(row["p50"], 3),
+                "p95 (s)": round(row["p95"], 3),
+                "p99 (s)": round(row["p99"], 3),
+                "First token p50 (s)": round(row["ttft_p50"], 3),
+                "Prompt tokens": row["prompt_tokens"],
+                "Output tokens": row["output_tokens"],
+            }
+            for row in rows
+        ],
+        use_container_width=True
+    )
+else:
+    st.info("No model calls yet.")
+
+if counters:
+    st.subheader("Events")
+    st.dataframe(
+        [
+            {"Event": name, "Labels": ", ".join(f"{key}={value}" for key, value in labels.items()), "Count": count}
+            for name, labels, count in counters
+        ],
+        use_container_width=True
+    )
+
+# Module content held by sessions is interned, so learners on the same path share one copy
+memory = content_pool.report()
+st.subheader("Shared Module Content")
+col1, col2, col3 = st.columns(3)
+col1.metric("Unique modules", memory["entries"], f"{memory['references']} references", delta_color="off")
+col2.metric("Held (MiB)", f"{memory['unique_bytes'] / 2**20:.2f}")
+col3.metric("Saved by sharing (MiB)", f"{memory['saved_bytes'] / 2**20:.2f}")
+
+st.download_button("Download Prometheus metrics", registry.prometheus_text(), file_name="metrics.prom")
+
+if st.button("Refresh"):
+    st.rerun()
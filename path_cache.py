@@ -0,0 +1,155 @@
+import copy
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+# Normalize the inputs that decide what a learning path looks like, so that
+# "Python ", "python" and "PYTHON" all share one cache entry
+def normalize_path_key(subject, knowledge_level, learning_style):
+    return (
+        " ".join(subject.lower().split()),
+        knowledge_level.strip().lower(),
+        learning_style.strip().lower(),
+    )
+
+
+# Process-wide LRU + TTL cache of generated learning paths, persisted to a JSON file.
+# The file is rewritten by a background thread, at most once per save_interval, from
+# a snapshot of the entries, so learners never wait on the disk. Entries are never
+# changed in place once stored, which is what makes the snapshot safe to write out.
+class PathCache:
+    def __init__(self, file_path, max_entries=500, ttl_seconds=7 * 24 * 3600, save_interval=1.0):
+        self.file_path = file_path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.save_interval = save_interval
+        self._entries = OrderedDict()
+        self._changed = False
+        self._saving = False
+        self._flush_requested = False
+        self._condition = threading.Condition()
+        self._load()
+        self._saver = threading.Thread(target=self._save_loop, name="path-cache-saver", daemon=True)
+        self._saver.start()
+
+    def _load(self):
+        try:
+            with open(self.file_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        now = time.time()
+        # Entries are written oldest first, so insertion order restores the LRU order
+        for entry in data.get("entries", []):
+            if now - entry["created"] < self.ttl_seconds:
+                self._entries[tuple(entry["key"])] = entry
+        self._evict()
+
+    def _save(self, entries):
+        directory = os.path.dirname(self.file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Write to a temporary file first so a crash never leaves a half-written cache
+        tmp_path = f"{self.file_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"entries": entries}, f)
+        os.replace(tmp_path, self.file_path)
+
+    def _save_loop(self):
+        while True:
+            with self._condition:
+                while not self._changed:
+                    self._condition.wait()
+                # Let a burst of changes go out in one write, unless someone is waiting for it
+                deadline = time.monotonic() + self.save_interval
+                while not self._flush_requested:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                entries = list(self._entries.values())
+                self._changed = False
+                self._flush_requested = False
+                self._saving = True
+
+            try:
+                self._save(entries)
+            except OSError:
+                # A read-only disk should only cost us persistence, not the in-memory cache
+                pass
+            finally:
+                with self._condition:
+                    self._saving = False
+                    self._condition.notify_all()
+
+    # Have the saver write the entries out; called with the lock held
+    def _schedule_save(self):
+        self._evict()
+        self._changed = True
+        self._condition.notify_all()
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key):
+        with self._condition:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            if time.time() - entry["created"] >= self.ttl_seconds:
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            # Hand out a copy so one session's edits never leak into another's path
+            return copy.deepcopy(entry["path"])
+
+    def put(self, key, learning_path):
+        entry = {
+            "key": list(key),
+            "created": time.time(),
+            "path": copy.deepcopy(learning_path),
+        }
+        with self._condition:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._schedule_save()
+
+    # Fill in a module of a cached path with its generated details, if the cached
+    # module is still the one with this title and description. Only that module is
+    # copied, not the whole path. Returns whether the module was filled in.
+    def update_module(self, key, module_id, title, description, details):
+        details = copy.deepcopy(details)
+        with self._condition:
+            entry = self._entries.get(key)
+            if entry is None or len(entry["path"]["modules"]) < module_id:
+                return False
+            module = entry["path"]["modules"][module_id - 1]
+            if (module.get("title"), module.get("description")) != (title, description):
+                return False
+
+            modules = list(entry["path"]["modules"])
+            modules[module_id - 1] = {**module, **details}
+            self._entries[key] = {**entry, "path": {**entry["path"], "modules": modules}}
+            self._entries.move_to_end(key)
+            self._schedule_save()
+            return True
+
+    # Block until every change so far has been written to the file
+    def flush(self):
+        with self._condition:
+            if self._changed:
+                self._flush_requested = True
+                self._condition.notify_all()
+            while self._changed or self._saving:
+                self._condition.wait()
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,328 @@
+import json
+import re
+
+
+# Model output sometimes carries raw newlines inside strings, which strict JSON rejects
+def _loads(text):
+    try:
+        return json.loads(text, strict=False)
+    except ValueError:
+        return None
+
+
+# Incremental JSON parser for a learning path that is still being generated.
+# Feed it text chunks as they stream in and it reports each top-level field
+# and each entry of "modules" as soon as that piece of JSON is complete.
+class IncrementalPathParser:
+    def __init__(self):
+        self.buffer = ""
+        self.done = False
+        self.result = None
+        self._pos = 0
+        self._root_start = None
+        self._stack = []          # open containers as (bracket, start offset, key in root)
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._expect_key = False  # only tracked for the root object
+        self._key = None
+
+    def feed(self, chunk):
+        events = []
+        if self.done:
+            return events
+
+        self.buffer += chunk
+        buffer = self.buffer
+        i = self._pos
+
+        # Skip anything the model puts before the JSON, like a ```json fence
+        if self._root_start is None:
+            start = buffer.find("{", i)
+            if start == -1:
+                self._pos = len(buffer)
+                return events
+            self._root_start = start
+            i = start
+
+        while i < len(buffer):
+            char = buffer[i]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if len(self._stack) == 1:
+                        text = _loads(buffer[self._string_start:i + 1])
+                        if self._expect_key:
+                            self._key = text
+                        elif text is not None:
+                            events.append((self._key, text))
+                i += 1
+                continue
+
+            if char == '"':
+                self._in_string = True
+                self._string_start = i
+            elif char in "{[":
+                self._stack.append((char, i, self._key if len(self._stack) == 1 else None))
+                if len(self._stack) == 1:
+                    self._expect_key = True
+            elif char in "}]":
+                if not self._stack:
+                    i += 1
+                    continue
+                _, start, root_key = self._stack.pop()
+                depth = len(self._stack)
+                if depth == 0:
+                    self.result = _loads(buffer[start:i + 1])
+                    self.done = True
+                    events.append(("done", self.result))
+                    self._pos = i + 1
+                    return events
+                if depth == 1:
+                    value = _loads(buffer[start:i + 1])
+                    if value is not None:
+                        events.append((root_key, value))
+                elif depth == 2 and char == "}" and self._stack[1][2] == "modules":
+                    module = _loads(buffer[start:i + 1])
+                    if module is not None:
+                        events.append(("module", module))
+            elif len(self._stack) == 1:
+                if char == ",":
+                    self._expect_key = True
+                elif char == ":":
+                    self._expect_key = False
+            i += 1
+
+        self._pos = i
+        return events
+
+
+# Pull the JSON payload out of a model response that may be wrapped in a code fence.
+# Module content can hold fenced code samples of its own, so only the outermost fence
+# is taken off: the payload runs from the opening fence to the last closing fence
+# with no JSON after it, or to the end if the response was cut off before it closed.
+def extract_json(content):
+    stripped = content.strip()
+    # Bare JSON may itself contain fenced code samples inside module content
+    if stripped.startswith(("{", "[")):
+        return stripped
+    start = content.find("```json")
+    if start == -1:
+        start = content.find("```")
+    if start == -1:
+        return stripped
+    payload = re.sub(r"^[A-Za-z]*", "", content[start + 3:])
+    end = payload.rfind("```")
+    if end != -1 and not re.search(r"[\]}]", payload[end:]):
+        payload = payload[:end]
+    return payload.strip()
+
+
+# Response schema matching the module/exercise structure the app renders,
+# so the model is constrained to emit JSON we can load directly
+EXERCISE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "question": {"type": "STRING"},
+        "options": {"type": "ARRAY", "items": {"type": "STRING"}},
+        "answer": {"type": "STRING"},
+        "explanation": {"type": "STRING"},
+    },
+    "required": ["question", "options", "answer", "explanation"],
+}
+
+MODULE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "id": {"type": "INTEGER"},
+        "title": {"type": "STRING"},
+        "description": {"type": "STRING"},
+        "content": {"type": "STRING"},
+        "exercises": {"type": "ARRAY", "items": EXERCISE_SCHEMA},
+        "additional_resources": {"type": "ARRAY", "items": {"type": "STRING"}},
+    },
+    "required": ["id", "title", "description", "content", "exercises"],
+}
+
+MODULE_DETAILS_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "content": {"type": "STRING"},
+        "exercises": {"type": "ARRAY", "items": EXERCISE_SCHEMA},
+        "additional_resources": {"type": "ARRAY", "items": {"type": "STRING"}},
+    },
+    "required": ["content", "exercises"],
+}
+
+# A batch of practice questions, each with the id of the module it tests
+PRACTICE_QUESTIONS_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {"module_id": {"type": "INTEGER"}, **EXERCISE_SCHEMA["properties"]},
+        "required": ["module_id"] + EXERCISE_SCHEMA["required"],
+    },
+}
+
+# Outline of a path: module titles and descriptions only, details come later
+OUTLINE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "subject": {"type": "STRING"},
+        "overview": {"type": "STRING"},
+        "modules": {
+            "type": "ARRAY",
+            "items": {
+                "type": "OBJECT",
+                "properties": {
+                    "id": {"type": "INTEGER"},
+                    "title": {"type": "STRING"},
+                    "description": {"type": "STRING"},
+                },
+                "required": ["id", "title", "description"],
+            },
+        },
+    },
+    "required": ["subject", "overview", "modules"],
+}
+
+LEARNING_PATH_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "subject": {"type": "STRING"},
+        "overview": {"type": "STRING"},
+        "modules": {"type": "ARRAY", "items": MODULE_SCHEMA},
+    },
+    "required": ["subject", "overview", "modules"],
+}
+
+
+def _clean_exercise(exercise):
+    if not isinstance(exercise, dict):
+        return None
+
+    question = exercise.get("question")
+    answer = exercise.get("answer")
+    if not isinstance(question, str) or not isinstance(answer, str):
+        return None
+
+    cleaned = {"question": question, "answer": answer, "explanation": str(exercise.get("explanation", ""))}
+
+    options = exercise.get("options")
+    if isinstance(options, list) and options:
+        options = [str(option) for option in options]
+        if answer not in options:
+            # The model sometimes restates the answer with different spacing or case
+            matches = [option for option in options if option.strip().lower() == answer.strip().lower()]
+            if not matches:
+                return None
+            cleaned["answer"] = matches[0]
+        cleaned["options"] = options
+    return cleaned
+
+
+# Validate the generated body of a module: its content, exercises and resources
+def clean_module_details(details):
+    if not isinstance(details, dict) or not isinstance(details.get("content"), str):
+        return None
+
+    exercises = [_clean_exercise(exercise) for exercise in details.get("exercises") or []]
+    resources = details.get("additional_resources") or []
+    return {
+        "content": details["content"],
+        "exercises": [exercise for exercise in exercises if exercise],
+        "additional_resources": [str(resource) for resource in resources if isinstance(resource, str)],
+    }
+
+
+def _clean_module(module, module_id, outline=False):
+    if not isinstance(module, dict):
+        return None
+
+    title = module.get("title")
+    if not isinstance(title, str) or not title.strip():
+        return None
+
+    cleaned = {
+        # Ids are renumbered by position since the UI relies on them running 1..n
+        "id": module_id,
+        "title": title,
+        "description": str(module.get("description", "")),
+    }
+
+    if outline:
+        # Content and exercises are generated later, when the module is opened
+        cleaned.update({"content": None, "exercises": None, "additional_resources": []})
+        return cleaned
+
+    details = clean_module_details(module)
+    if details is None:
+        return None
+    cleaned.update(details)
+    return cleaned
+
+
+# Validate a loaded learning path, dropping any module that does not have the expected shape
+def validate_learning_path(data, outline=False):
+    if not isinstance(data, dict) or not isinstance(data.get("modules"), list):
+        return None
+
+    modules = []
+    for module in data["modules"]:
+        cleaned = _clean_module(module, len(modules) + 1, outline)
+        if cleaned:
+            modules.append(cleaned)
+    if not modules:
+        return None
+
+    return {
+        "subject": str(data.get("subject", "")),
+        "overview": str(data.get("overview", "")),
+        "modules": modules,
+    }
+
+
+# Parse a model response into a learning path. When the JSON is broken or cut
+# short, the complete modules are salvaged locally instead of asking the model
+# again. Returns the path (or None) and whether it came through intact.
+def parse_learning_path(content, outline=False):
+    json_str = extract_json(content)
+    data = _loads(json_str)
+    complete = isinstance(data, dict)
+
+    if not complete:
+        parser = IncrementalPathParser()
+        data = {"modules": []}
+        for field, value in parser.feed(json_str):
+            if field == "module":
+                data["modules"].append(value)
+            elif field in ("subject", "overview"):
+                data[field] = value
+
+    learning_path = validate_learning_path(data, outline)
+    if learning_path is None:
+        return None, False
+    return learning_path, complete and len(learning_path["modules"]) == len(data["modules"])
+
+
+# Parse the content, exercises and resources generated for a single outline module
+def parse_module_details(content):
+    return clean_module_details(_loads(extract_json(content)))
+
+
+# Parse a batch of generated practice questions into (module id, exercise) pairs, dropping unusable ones
+def parse_practice_questions(content):
+    data = _loads(extract_json(content))
+    if not isinstance(data, list):
+        return []
+    questions = []
+    for item in data:
+        exercise = _clean_exercise(item)
+        if exercise and isinstance(item.get("module_id"), int):
+            questions.append((item["module_id"], exercise))
+    return questions
@@ -0,0 +1,40 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Background worker pool for generating module details ahead of time. Work is
+# keyed so a module that is already being generated (by a prefetch or by
+# another session) is never requested twice; callers share the same future.
+class ModulePrefetcher:
+    def __init__(self, max_workers=4, max_unclaimed=256):
+        self.max_unclaimed = max_unclaimed
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="module-prefetch")
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key, fn, *args):
+        with self._lock:
+            future = self._futures.get(key)
+            if future is None or (future.done() and future.exception() is not None):
+                future = self._executor.submit(fn, *args)
+                self._futures[key] = future
+                self._trim()
+            return future
+
+    # Wait for the work behind key (starting it if needed) and hand over the result
+    def result(self, key, fn, *args):
+        future = self.submit(key, fn, *args)
+        try:
+            return future.result()
+        finally:
+            with self._lock:
+                if self._futures.get(key) is future:
+                    del self._futures[key]
+
+    # Forget the oldest finished results nobody came back for, so abandoned prefetches don't pile up
+    def _trim(self):
+        for key in list(self._futures):
+            if len(self._futures) <= self.max_unclaimed:
+                break
+            if self._futures[key].done():
+                del self._futures[key]
@@ -0,0 +1,116 @@
+# Pre-generate learning paths for a known syllabus into the content catalog the
+# app serves from, so the first learner to ask for one of them gets it from disk.
+# Every subject is generated for every knowledge level and learning style given.
+# Paths already in the catalog are skipped, so an interrupted run can simply be
+# started again.
+#
+#   python pregenerate.py syllabus.txt [--levels Beginner,Advanced] [--styles Visual] [--workers 4] [--rpm 60]
+#
+# The syllabus file has one subject per line; blank lines and lines starting with
+# # are ignored. Settings such as GEMINI_API_KEY, MODEL_BACKEND and CATALOG_DIR are
+# read from the environment (or .env) like the app does.
+import argparse
+import itertools
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from dotenv import load_dotenv
+
+from backends import create_model
+from catalog import ContentCatalog
+from metrics import InstrumentedModel, registry
+from path_cache import normalize_path_key
+from path_parser import parse_learning_path
+from prompts import LEARNING_PATH_CONFIG, learning_path_prompt
+from scheduler import BULK, ModelScheduler
+
+LEVELS = ["Beginner", "Intermediate", "Advanced", "Expert"]
+STYLES = ["Visual", "Auditory", "Reading/Writing", "Kinesthetic"]
+
+
+def read_syllabus(file_path):
+    with open(file_path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+
+def split_list(value):
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+# Generate one path, retrying replies that were cut off or did not validate
+def generate_path(model, subject, knowledge_level, learning_style, attempts):
+    prompt = learning_path_prompt(subject, knowledge_level, learning_style)
+    for _ in range(attempts):
+        response = model.generate_content(
+            prompt, generation_config=LEARNING_PATH_CONFIG, caller="pregenerate", priority=BULK
+        )
+        learning_path, complete = parse_learning_path(response.text)
+        if learning_path and complete:
+            learning_path["subject"] = learning_path["subject"] or subject
+            return learning_path
+        registry.increment("parse_failures_total", caller="pregenerate")
+    raise ValueError(f"no complete learning path after {attempts} attempts")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-generate learning paths into the content catalog")
+    parser.add_argument("syllabus", help="file with one subject per line")
+    parser.add_argument("--levels", type=split_list, default=LEVELS, help="comma separated knowledge levels")
+    parser.add_argument("--styles", type=split_list, default=STYLES, help="comma separated learning styles")
+    parser.add_argument("--workers", type=int, default=4, help="paths generated at the same time")
+    parser.add_argument("--rpm", type=int, default=0, help="model requests per minute (0 for no limit)")
+    parser.add_argument("--tpm", type=int, default=0, help="model tokens per minute (0 for no limit)")
+    parser.add_argument("--attempts", type=int, default=2, help="tries per path when a reply does not validate")
+    args = parser.parse_args()
+
+    load_dotenv()
+    backend = os.getenv("MODEL_BACKEND", "gemini")
+    model = ModelScheduler(
+        InstrumentedModel(create_model(backend, os.getenv("GEMINI_API_KEY")), registry),
+        rpm=args.rpm,
+        tpm=args.tpm,
+        max_concurrency=args.workers,
+        reserved_interactive=0,
+        max_retries=int(os.getenv("MODEL_MAX_RETRIES", "4")),
+        registry=registry
+    )
+    catalog = ContentCatalog(os.getenv("CATALOG_DIR", os.path.join(".cache", "catalog")))
+
+    jobs = []
+    for subject, level, style in itertools.product(read_syllabus(args.syllabus), args.levels, args.styles):
+        key = normalize_path_key(subject, level, style)
+        if key not in catalog:
+            jobs.append((key, subject, level, style))
+    print(f"{len(jobs)} paths to generate, {len(catalog)} already in the catalog", flush=True)
+
+    started = time.perf_counter()
+    failed = 0
+    executor = ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix="pregenerate")
+    try:
+        futures = {
+            executor.submit(generate_path, model, subject, level, style, args.attempts): (key, subject, level, style)
+            for key, subject, level, style in jobs
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            key, subject, level, style = futures[future]
+            try:
+                catalog.put(key, future.result())
+                status = "ok"
+            except Exception as e:
+                failed += 1
+                status = f"failed: {e}"
+            print(f"[{done}/{len(jobs)}] {subject} / {level} / {style}: {status}", flush=True)
+    except KeyboardInterrupt:
+        print("Interrupted; run again to continue where this run stopped.", file=sys.stderr)
+        executor.shutdown(wait=False, cancel_futures=True)
+        return 130
+    executor.shutdown()
+
+    print(f"Done in {time.perf_counter() - started:.1f}s, {len(jobs) - failed} generated, {failed} failed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,44 @@
+from path_parser import LEARNING_PATH_SCHEMA
+
+
+# Prompts shared by the app and the offline catalog generator, so a pre-generated
+# path is the same as one generated on request.
+
+# Ask for JSON that follows the learning path schema instead of free text
+LEARNING_PATH_CONFIG = {
+    "response_mime_type": "application/json",
+    "response_schema": LEARNING_PATH_SCHEMA
+}
+
+
+def learning_path_prompt(subject, knowledge_level, learning_style):
+    return f"""
+    Create a comprehensive learning path for teaching {subject} to a {knowledge_level.lower()} level student 
+    who prefers {learning_style} learning style.
+    
+    Format the output as a valid JSON object with the following structure:
+    {{
+        "subject": "{subject}",
+        "overview": "Brief overview of what they will learn",
+        "modules": [
+            {{
+                "id": 1,
+                "title": "Module title",
+                "description": "Short description",
+                "content": "Detailed learning content formatted for {learning_style} learners",
+                "exercises": [
+                    {{
+                        "question": "Practice question",
+                        "options": ["Option A", "Option B", "Option C", "Option D"],
+                        "answer": "Correct option",
+                        "explanation": "Detailed explanation of the answer"
+                    }}
+                ],
+                "additional_resources": ["Resource 1", "Resource 2"]
+            }}
+        ]
+    }}
+    
+    Include 5-7 modules with gradually increasing complexity, and 3-5 exercises per module.
+    Ensure content is adapted to {learning_style} learning style by including appropriate examples and explanations.
+    """
@@ -0,0 +1,185 @@
+import heapq
+import itertools
+import threading
+
+from learning_path import Exercise
+
+# How many answers later a question comes back, by how many times in a row it has
+# been answered correctly. A wrong answer starts it over at the first gap.
+REVIEW_GAPS = (3, 8, 20, 50, 120, 300)
+
+
+class PracticeQuestion:
+    __slots__ = ("id", "module_id", "exercise", "attempts", "correct", "streak", "due", "version")
+
+    def __init__(self, question_id, module_id, exercise, attempts=0, correct=0, streak=0, due=0):
+        self.id = question_id
+        self.module_id = module_id
+        self.exercise = exercise
+        self.attempts = attempts
+        self.correct = correct
+        self.streak = streak      # correct answers in a row
+        self.due = due            # comes back once the bank has had this many answers
+        self.version = 0          # heap entries with an older version are stale
+
+    # Share of wrong answers, counting the module's prior as two answers already given
+    def weakness(self, prior):
+        return (self.attempts - self.correct + 2 * prior) / (self.attempts + 2)
+
+
+# A learner's practice questions on one path and the order they come up in.
+# Questions that are due wait in a heap with the weakest on top: those answered
+# wrongly most often, and new ones from modules with low quiz scores. Answered
+# questions wait in a second heap ordered by when they are due again, and move
+# over as the learner keeps answering. Picking and recording a question take
+# O(log n) however large the bank grows. A question answered out of turn (e.g.
+# in a module quiz) leaves a stale entry behind instead of being searched for;
+# stale entries are dropped when they reach the top, and the heaps are rebuilt
+# once they outnumber the questions.
+#
+# When fewer than low_water questions are left that the learner has not seen,
+# refill() writes more in one call on a background executor; they join the bank
+# at the next collect(). Until then the bank keeps serving reviews, so a question
+# is always ready without waiting for the model.
+class QuestionBank:
+    def __init__(self, low_water=5):
+        self.low_water = low_water
+        self.questions = {}          # question id -> PracticeQuestion
+        self.answered = 0            # answers recorded so far
+        self.unseen = 0              # questions never answered
+        self.seeded = set()          # modules whose own exercises are in the bank
+        self.module_weakness = {}    # module id -> 1 - latest quiz score, the prior for its questions
+        self._by_text = {}           # question text -> question id
+        self._module_answers = {}    # module id -> [answers, wrong answers]
+        self._ready = []             # (-weakness, seq, question id, version), due now
+        self._waiting = []           # (due, seq, question id, version), due later
+        self._seq = itertools.count()
+        self._future = None
+        self._lock = threading.Lock()
+
+    def _prior(self, module_id):
+        return self.module_weakness.get(module_id, 0.5)
+
+    def _push(self, question):
+        question.version += 1
+        if question.due <= self.answered:
+            entry = (-question.weakness(self._prior(question.module_id)), next(self._seq), question.id, question.version)
+            heapq.heappush(self._ready, entry)
+        else:
+            heapq.heappush(self._waiting, (question.due, next(self._seq), question.id, question.version))
+
+    def _live(self, entry):
+        return self.questions[entry[2]].version == entry[3]
+
+    def _rebuild(self):
+        self._ready, self._waiting = [], []
+        for question in self.questions.values():
+            self._push(question)
+
+    def _insert(self, question):
+        self.questions[question.id] = question
+        self._by_text[question.exercise.question] = question.id
+        answers = self._module_answers.setdefault(question.module_id, [0, 0])
+        answers[0] += question.attempts
+        answers[1] += question.attempts - question.correct
+        self.answered += question.attempts
+        if not question.attempts:
+            self.unseen += 1
+        self._push(question)
+        return question
+
+    # Add a new question; returns None if the bank already has the same question
+    def add(self, module_id, exercise):
+        with self._lock:
+            if exercise.question in self._by_text:
+                return None
+            return self._insert(PracticeQuestion(len(self.questions) + 1, module_id, exercise))
+
+    # Put back a question saved earlier, with its results
+    def restore(self, question_id, module_id, exercise, attempts, correct, streak, due):
+        with self._lock:
+            return self._insert(PracticeQuestion(question_id, module_id, exercise, attempts, correct, streak, due))
+
+    def find(self, text):
+        question_id = self._by_text.get(text)
+        return None if question_id is None else self.questions[question_id]
+
+    # The question to practise next, without taking it out of the bank: the weakest
+    # one that is due, or else the one due soonest. None only if the bank is empty.
+    def next(self):
+        with self._lock:
+            while self._waiting and self._waiting[0][0] <= self.answered:
+                entry = heapq.heappop(self._waiting)
+                if self._live(entry):
+                    self._push(self.questions[entry[2]])
+            for heap in (self._ready, self._waiting):
+                while heap and not self._live(heap[0]):
+                    heapq.heappop(heap)
+                if heap:
+                    return self.questions[heap[0][2]]
+            return None
+
+    # Record an answer and schedule the question's next review
+    def record(self, question_id, correct):
+        with self._lock:
+            question = self.questions[question_id]
+            if not question.attempts:
+                self.unseen -= 1
+            question.attempts += 1
+            question.correct += bool(correct)
+            question.streak = question.streak + 1 if correct else 0
+            answers = self._module_answers.setdefault(question.module_id, [0, 0])
+            answers[0] += 1
+            answers[1] += not correct
+            self.answered += 1
+            question.due = self.answered + REVIEW_GAPS[min(question.streak, len(REVIEW_GAPS) - 1)]
+            self._push(question)
+            if len(self._ready) + len(self._waiting) > 2 * len(self.questions):
+                self._rebuild()
+            return question
+
+    # Take the latest quiz score of each module as the prior for its questions
+    def set_module_scores(self, scores):
+        with self._lock:
+            self.module_weakness = {module_id: 1 - score / 100 for module_id, score in scores.items()}
+            self._rebuild()
+
+    # Modules the learner does worst in, weakest first, out of those in the bank
+    def weakest_modules(self, count):
+        def weakness(module_id):
+            answers, wrong = self._module_answers.get(module_id, (0, 0))
+            return (wrong + 2 * self._prior(module_id)) / (answers + 2)
+        return sorted(self.seeded, key=lambda module_id: (-weakness(module_id), module_id))[:count]
+
+    # The latest questions on the given modules, to tell the model what not to repeat
+    def questions_on(self, module_ids, limit):
+        texts = [q.exercise.question for q in reversed(list(self.questions.values())) if q.module_id in module_ids]
+        return texts[:limit]
+
+    def running_low(self):
+        return self._future is None and self.unseen < self.low_water
+
+    def refill(self, executor, generate, *args):
+        with self._lock:
+            if self._future is None:
+                self._future = executor.submit(generate, *args)
+
+    # Add the questions written since the last call, if they are ready, and return
+    # the ones that were new. generate must return [(module id, exercise dict)].
+    def collect(self):
+        with self._lock:
+            if self._future is None or not self._future.done():
+                return []
+            future, self._future = self._future, None
+        try:
+            generated = future.result()
+        except Exception:
+            # Nothing was added, so the next top-up tries again
+            return []
+        added = []
+        for module_id, exercise in generated:
+            if module_id in self.seeded:
+                question = self.add(module_id, Exercise.from_dict(exercise))
+                if question:
+                    added.append(question)
+        return added
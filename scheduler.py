@@ -0,0 +1,260 @@
+import asyncio
+import heapq
+import itertools
+import random
+import sys
+import threading
+import time
+
+
+# Priority classes, lowest first. Interactive calls are the ones a learner is
+# staring at a spinner for; bulk work builds whole paths; background work is
+# prefetching that nobody is waiting on yet.
+INTERACTIVE = 0
+BULK = 1
+BACKGROUND = 2
+
+CALLER_PRIORITIES = {
+    "get_ai_explanation": INTERACTIVE,
+    "summarize_conversation": BACKGROUND,
+    "evaluate_quiz_answer": INTERACTIVE,
+    "evaluate_quiz_batch": INTERACTIVE,
+    "create_learning_path": BULK,
+    "create_learning_path_outline": BULK,
+    "create_simpler_learning_path": BULK,
+    "generate_module_details": BACKGROUND,
+    "generate_practice_questions": BACKGROUND,
+}
+
+# HTTP statuses worth another attempt: rate limited, server errors and timeouts
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def _status(error):
+    code = getattr(error, "code", None)
+    # google.api_core exceptions carry the HTTP status as an int; grpc codes are enums
+    return code if isinstance(code, int) else None
+
+
+def is_retryable(error):
+    return _status(error) in RETRY_STATUSES or isinstance(error, (ConnectionError, TimeoutError))
+
+
+def _estimate_tokens(prompt):
+    return max(1, len(prompt) // 4) if isinstance(prompt, str) else 1
+
+
+def _output_tokens(response):
+    usage = getattr(response, "usage_metadata", None)
+    return getattr(usage, "candidates_token_count", 0) or 0 if usage is not None else 0
+
+
+# Refills continuously up to capacity; a rate of 0 means unlimited. The level can
+# go negative when a call turns out to cost more than was reserved for it.
+class TokenBucket:
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        if self.rate:
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    # Seconds until amount can be taken, 0 if it can be taken now
+    def wait_time(self, amount):
+        if not self.rate:
+            return 0.0
+        amount = min(amount, self.capacity)
+        return max(0.0, (amount - self.level) / self.rate)
+
+    def take(self, amount):
+        if self.rate:
+            self.level -= min(amount, self.capacity)
+
+
+# Releases the scheduler slot once the stream has been read (or dropped)
+class _ScheduledStream:
+    def __init__(self, response, release):
+        self._response = response
+        self._release = release
+
+    def __iter__(self):
+        try:
+            yield from self._response
+        finally:
+            self._release(_output_tokens(self._response))
+
+    def __del__(self):
+        self._release(0)
+
+    def __getattr__(self, name):
+        return getattr(self._response, name)
+
+
+# A wait for a slot on behalf of an async call, shared with the thread that waits
+class _Claim:
+    __slots__ = ("abandoned", "acquired")
+
+    def __init__(self):
+        self.abandoned = False
+        self.acquired = False
+
+
+# Model wrapper that every call goes through. Calls wait for a slot in priority
+# order, subject to requests-per-minute and tokens-per-minute buckets and a cap on
+# calls in flight; the last reserved slots are kept for interactive calls. Calls
+# that fail with a rate limit or transient error are retried with jittered
+# exponential backoff, going back through the queue each time.
+class ModelScheduler:
+    def __init__(self, model, rpm=0, tpm=0, max_concurrency=8, reserved_interactive=1,
+                 max_retries=4, base_delay=1.0, max_delay=30.0, registry=None):
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.reserved_interactive = min(reserved_interactive, max_concurrency - 1)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.registry = registry
+        self._requests = TokenBucket(rpm)
+        self._tokens = TokenBucket(tpm)
+        self._active = 0
+        self._waiting = []
+        self._order = itertools.count()
+        self._cond = threading.Condition()
+
+    def _limit(self, priority):
+        return self.max_concurrency if priority == INTERACTIVE else self.max_concurrency - self.reserved_interactive
+
+    # Wait for a slot and take it. A claim lets an async caller that has gone away
+    # stop the wait, or have the slot handed straight back if it was already taken.
+    def _acquire(self, priority, cost, claim=None):
+        with self._cond:
+            entry = (priority, next(self._order))
+            heapq.heappush(self._waiting, entry)
+            try:
+                while True:
+                    if claim is not None and claim.abandoned:
+                        return
+                    timeout = None
+                    if self._waiting[0] == entry and self._active < self._limit(priority):
+                        now = time.monotonic()
+                        self._requests.refill(now)
+                        self._tokens.refill(now)
+                        timeout = max(self._requests.wait_time(1), self._tokens.wait_time(cost))
+                        if timeout <= 0:
+                            break
+                    self._cond.wait(timeout)
+            finally:
+                self._waiting.remove(entry)
+                heapq.heapify(self._waiting)
+                self._cond.notify_all()
+            self._requests.take(1)
+            self._tokens.take(cost)
+            self._active += 1
+            if claim is not None:
+                claim.acquired = True
+
+    def _release(self, output_tokens=0):
+        with self._cond:
+            self._active -= 1
+            self._tokens.take(output_tokens)
+            self._cond.notify_all()
+
+    # A 429 means the server's window is tighter than ours, so stop everyone for a moment
+    def _throttle(self):
+        with self._cond:
+            self._requests.level = min(self._requests.level, 0.0)
+
+    def _backoff(self, attempt):
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _retry_or_raise(self, error, attempt, caller):
+        if attempt >= self.max_retries or not is_retryable(error):
+            raise error
+        if _status(error) == 429:
+            self._throttle()
+        if self.registry:
+            self.registry.increment("model_retries_total", caller=caller, status=_status(error) or "network")
+        return self._backoff(attempt)
+
+    def _priority(self, caller, priority):
+        return CALLER_PRIORITIES.get(caller, INTERACTIVE) if priority is None else priority
+
+    def generate_content(self, prompt, *args, caller=None, priority=None, stream=False, **kwargs):
+        caller = caller or sys._getframe(1).f_code.co_name
+        priority = self._priority(caller, priority)
+        cost = _estimate_tokens(prompt)
+        for attempt in itertools.count():
+            self._acquire(priority, cost)
+            try:
+                response = self.model.generate_content(prompt, *args, caller=caller, stream=stream, **kwargs)
+            except Exception as e:
+                self._release()
+                time.sleep(self._retry_or_raise(e, attempt, caller))
+                continue
+            except BaseException:
+                self._release()
+                raise
+
+            # Only starting a stream is retried; once chunks have been handed out an error goes to the reader
+            if stream:
+                return _ScheduledStream(response, self._release_once())
+            self._release(_output_tokens(response))
+            return response
+
+    async def generate_content_async(self, prompt, *args, caller=None, priority=None, **kwargs):
+        caller = caller or sys._getframe(1).f_code.co_name
+        priority = self._priority(caller, priority)
+        cost = _estimate_tokens(prompt)
+        for attempt in itertools.count():
+            # Waiting for a slot blocks, so do it off the event loop
+            claim = _Claim()
+            try:
+                await asyncio.to_thread(self._acquire, priority, cost, claim)
+            except asyncio.CancelledError:
+                self._abandon(claim)
+                raise
+            try:
+                response = await self.model.generate_content_async(prompt, *args, caller=caller, **kwargs)
+            except Exception as e:
+                self._release()
+                await asyncio.sleep(self._retry_or_raise(e, attempt, caller))
+                continue
+            except BaseException:
+                self._release()
+                raise
+            self._release(_output_tokens(response))
+            return response
+
+    # Give up a claim whose caller was cancelled: the waiting thread stops waiting, or if
+    # it already took the slot, the slot is released here. Both sides check and set the
+    # claim under the lock, so exactly one of them sees that the slot was taken.
+    def _abandon(self, claim):
+        with self._cond:
+            claim.abandoned = True
+            self._cond.notify_all()
+            if claim.acquired:
+                self._release()
+
+    # Release callback for streams, safe to call more than once
+    def _release_once(self):
+        lock = threading.Lock()
+        state = {"released": False}
+
+        def release(output_tokens=0):
+            with lock:
+                if state["released"]:
+                    return
+                state["released"] = True
+            self._release(output_tokens)
+        return release
+
+    def stats(self):
+        with self._cond:
+            return {"active": self._active, "waiting": len(self._waiting)}
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
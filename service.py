@@ -0,0 +1,372 @@
+# JSON service over the same core as the Streamlit app, for LMS integrations and
+# other programs that want learning paths, explanations and quiz feedback without
+# the UI. It runs on asyncio, keeps connections alive between requests and has
+# many model calls in flight at once.
+#
+#   python service.py [--host 127.0.0.1] [--port 8080]
+#
+# Every request names its learner: "user" in the JSON body (or the query string
+# for GET requests), with optional "knowledge_level" and "learning_style". A
+# learner's open paths and conversations are kept between requests for the most
+# recently active learners, and requests for one learner are handled one at a
+# time. When SERVICE_TOKEN is set, requests must send "Authorization: Bearer <token>".
+#
+#   POST /paths                          {"user", "subject", "outline": false} -> the new learning path
+#   GET  /paths?user=                    subjects and overviews of the learner's paths
+#   GET  /paths/{subject}?user=          one learning path
+#   GET  /paths/{subject}/modules/{id}?user=   one module, generated first if needed
+#   POST /explain                        {"user", "subject", "module_id", "question", "stream": false} -> {"answer"}
+#   POST /evaluate                       {"user", "subject", "module_id", "answers": [{"question", "correct_answer", "user_answer"}]}
+#   POST /complete                       {"user", "subject", "module_id"} -> progress on the path
+#   POST /quiz-scores                    {"user", "subject", "module_id", "score"} -> progress on the path
+#   GET  /practice/{subject}?user=       the next adaptive practice question, weakest material first
+#   POST /practice/answer                {"user", "subject", "question_id", "answer"} -> {"correct", ..., "next"}
+#   GET  /progress?user=                 progress on every path
+#   GET  /health
+#
+# Settings are read from the environment (or .env) like the app does; SERVICE_WORKERS
+# sets how many threads run blocking work such as streaming model calls and storage.
+import argparse
+import asyncio
+import json
+import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from aiohttp import web
+from dotenv import load_dotenv
+
+from core import LearnerState, LearningCore, create_scheduled_model
+
+
+def progress_dict(progress):
+    return {
+        "subject": progress.subject,
+        "started": progress.started,
+        "total_modules": progress.total_modules,
+        "current_module": progress.current_module,
+        "completed": [{"id": module_id, "title": title} for module_id, title in progress.completed.items()],
+        "percent": progress.percent,
+        "quiz_count": progress.quiz_count,
+    }
+
+
+# A practice question as the learner sees it, without its answer
+def practice_dict(question):
+    if question is None:
+        return None
+    return {
+        "question_id": question.id,
+        "module_id": question.module_id,
+        "question": question.exercise.question,
+        "options": list(question.exercise.options),
+    }
+
+
+def error(status, message):
+    return web.json_response({"error": message}, status=status)
+
+
+# Raised instead of returned where a handler cannot simply return an error response
+def bad_request(message):
+    return web.HTTPBadRequest(text=json.dumps({"error": message}), content_type="application/json")
+
+
+# Function to run a blocking generator on a worker thread, handing its chunks to the
+# event loop as they come. The generator runs on one thread from start to end: a
+# streaming model call holds a scheduler slot until it is read to the end, so it
+# must not wait for a free thread between chunks while other calls wait for slots.
+async def iterate_in_thread(chunks):
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    done = object()
+
+    def produce():
+        try:
+            for text in chunks:
+                loop.call_soon_threadsafe(queue.put_nowait, text)
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, done)
+
+    producer = loop.run_in_executor(None, produce)
+    while True:
+        text = await queue.get()
+        if text is done:
+            break
+        yield text
+    await producer
+
+
+# The most recently active learners, each with a lock so one learner's requests
+# do not interleave. Learners not seen for a while are dropped and reloaded from
+# the store when they come back, losing only their conversation memory.
+class Learners:
+    def __init__(self, core, max_learners=1000):
+        self.core = core
+        self.max_learners = max_learners
+        self._learners = OrderedDict()    # user name -> (LearnerState, asyncio.Lock)
+
+    async def get(self, params):
+        user_name = str(params.get("user") or "").strip()
+        if not user_name:
+            raise bad_request('"user" is required')
+        entry = self._learners.get(user_name)
+        if entry is None:
+            state = LearnerState(user_name)
+            await asyncio.to_thread(self.core.load_learner, state)
+            # Another request may have loaded the same learner in the meantime
+            entry = self._learners.setdefault(user_name, (state, asyncio.Lock()))
+        self._learners.move_to_end(user_name)
+        while len(self._learners) > self.max_learners:
+            self._learners.popitem(last=False)
+
+        # The profile is request-scoped: each request can ask for its own level and style
+        state, lock = entry
+        return state, lock, params.get("knowledge_level"), params.get("learning_style")
+
+
+def with_profile(state, knowledge_level, learning_style):
+    state.knowledge_level = knowledge_level or "Beginner"
+    state.learning_style = learning_style or "Visual"
+
+
+async def read_json(request):
+    try:
+        body = await request.json()
+    except ValueError:
+        raise bad_request("the body must be JSON")
+    if not isinstance(body, dict):
+        raise bad_request("the body must be a JSON object")
+    return body
+
+
+def create_app(core, max_learners=1000, token=None):
+    learners = Learners(core, max_learners)
+    routes = web.RouteTableDef()
+
+    @web.middleware
+    async def authenticate(request, handler):
+        if token and request.path != "/health" and request.headers.get("Authorization") != f"Bearer {token}":
+            return error(401, "missing or wrong bearer token")
+        return await handler(request)
+
+    # Look up the learner, path and module a request is about, or answer with an error
+    async def open_module(state, subject, module_id):
+        path = await asyncio.to_thread(core.load_learning_path, state, subject)
+        if path is None:
+            return None, error(404, f"no learning path for {subject!r}")
+        module = path.module(module_id)
+        if module is None:
+            return None, error(404, f"no module {module_id} in {subject!r}")
+        await asyncio.to_thread(core.load_module, state, subject, module)
+        return module, None
+
+    def module_id_of(value):
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            raise bad_request('"module_id" must be a number')
+
+    @routes.get("/health")
+    async def health(request):
+        return web.json_response({"status": "ok", "model": core.model is not None})
+
+    @routes.post("/paths")
+    async def create_path(request):
+        body = await read_json(request)
+        if not body.get("subject"):
+            return error(400, '"subject" is required')
+        if core.model is None:
+            return error(503, "no model is configured")
+        state, lock, *profile = await learners.get(body)
+        notices = []
+        async with lock:
+            with_profile(state, *profile)
+            if body.get("outline"):
+                create = core.create_learning_path_outline
+                args = (state, body["subject"])
+            else:
+                create = core.create_learning_path
+                args = (state, body["subject"], None, notices.append)
+            try:
+                learning_path = await asyncio.to_thread(create, *args)
+            except Exception as e:
+                return error(502, f"could not create the learning path: {e}")
+        return web.json_response({"learning_path": learning_path, "notices": notices})
+
+    @routes.get("/paths")
+    async def list_paths(request):
+        state, lock, *profile = await learners.get(request.query)
+        return web.json_response({"paths": state.path_overviews})
+
+    @routes.get("/paths/{subject}")
+    async def get_path(request):
+        state, lock, *profile = await learners.get(request.query)
+        async with lock:
+            path = await asyncio.to_thread(core.load_learning_path, state, request.match_info["subject"])
+            if path is None:
+                return error(404, f"no learning path for {request.match_info['subject']!r}")
+            return web.json_response(await asyncio.to_thread(path.to_dict))
+
+    @routes.get("/paths/{subject}/modules/{module_id}")
+    async def get_module(request):
+        state, lock, *profile = await learners.get(request.query)
+        async with lock:
+            try:
+                module, failed = await open_module(
+                    state, request.match_info["subject"], module_id_of(request.match_info["module_id"])
+                )
+            except ValueError as e:
+                return error(502, f"could not generate the module: {e}")
+            return failed or web.json_response(module.to_dict())
+
+    @routes.post("/explain")
+    async def explain(request):
+        body = await read_json(request)
+        if not body.get("question"):
+            return error(400, '"question" is required')
+        state, lock, *profile = await learners.get(body)
+        async with lock:
+            with_profile(state, *profile)
+            try:
+                module, failed = await open_module(state, body.get("subject"), module_id_of(body.get("module_id")))
+            except ValueError as e:
+                return error(502, f"could not generate the module: {e}")
+            if failed:
+                return failed
+
+            chunks = core.get_ai_explanation(state, body["question"], body["subject"], module)
+            if not body.get("stream"):
+                answer = await asyncio.to_thread("".join, chunks)
+                return web.json_response({"answer": answer})
+
+            # Plain text, sent as it is generated
+            response = web.StreamResponse(headers={"Content-Type": "text/plain; charset=utf-8"})
+            await response.prepare(request)
+            async for text in iterate_in_thread(chunks):
+                await response.write(text.encode("utf-8"))
+            await response.write_eof()
+            return response
+
+    @routes.post("/evaluate")
+    async def evaluate(request):
+        body = await read_json(request)
+        answers = body.get("answers")
+        fields = ("question", "correct_answer", "user_answer")
+        if not isinstance(answers, list) or not answers:
+            return error(400, '"answers" must be a non-empty list')
+        if not all(isinstance(answer, dict) and all(field in answer for field in fields) for answer in answers):
+            return error(400, 'every answer needs "question", "correct_answer" and "user_answer"')
+        state, lock, *profile = await learners.get(body)
+        async with lock:
+            with_profile(state, *profile)
+            path = await asyncio.to_thread(core.load_learning_path, state, body.get("subject"))
+            module = path.module(module_id_of(body.get("module_id"))) if path else None
+            if module is None:
+                return error(404, "no such learning path or module")
+            # Every answer is evaluated at the same time
+            evaluations = await asyncio.gather(*[
+                core.evaluate_quiz_answer_async(
+                    state, answer["user_answer"], answer["correct_answer"], answer["question"],
+                    body["subject"], module.title
+                )
+                for answer in answers
+            ])
+        return web.json_response({"evaluations": evaluations})
+
+    @routes.post("/complete")
+    async def complete(request):
+        body = await read_json(request)
+        state, lock, *profile = await learners.get(body)
+        async with lock:
+            module_id = module_id_of(body.get("module_id"))
+            path = await asyncio.to_thread(core.load_learning_path, state, body.get("subject"))
+            if path is None or path.module(module_id) is None:
+                return error(404, "no such learning path or module")
+            progress = await asyncio.to_thread(core.complete_module, state, body["subject"], module_id)
+            return web.json_response(progress_dict(progress))
+
+    @routes.post("/quiz-scores")
+    async def quiz_score(request):
+        body = await read_json(request)
+        if not isinstance(body.get("score"), (int, float)):
+            return error(400, '"score" must be a number')
+        state, lock, *profile = await learners.get(body)
+        async with lock:
+            module_id = module_id_of(body.get("module_id"))
+            path = await asyncio.to_thread(core.load_learning_path, state, body.get("subject"))
+            if path is None or path.module(module_id) is None:
+                return error(404, "no such learning path or module")
+            progress = await asyncio.to_thread(core.add_quiz_score, state, body["subject"], module_id, float(body["score"]))
+            return web.json_response(progress_dict(progress))
+
+    @routes.get("/practice/{subject}")
+    async def next_practice_question(request):
+        state, lock, *profile = await learners.get(request.query)
+        async with lock:
+            with_profile(state, *profile)
+            subject = request.match_info["subject"]
+            if await asyncio.to_thread(core.load_learning_path, state, subject) is None:
+                return error(404, f"no learning path for {subject!r}")
+            question = await asyncio.to_thread(core.next_practice_question, state, subject)
+            return web.json_response({"question": practice_dict(question)})
+
+    @routes.post("/practice/answer")
+    async def answer_practice_question(request):
+        body = await read_json(request)
+        if not isinstance(body.get("question_id"), int) or not isinstance(body.get("answer"), str):
+            return error(400, '"question_id" must be a number and "answer" a string')
+        state, lock, *profile = await learners.get(body)
+        async with lock:
+            with_profile(state, *profile)
+            question, correct = await asyncio.to_thread(
+                core.answer_practice_question, state, body.get("subject"), body["question_id"], body["answer"]
+            )
+            if question is None:
+                return error(404, "no such learning path or practice question")
+            # The next question is picked right away, so the client never has to wait for one
+            following = await asyncio.to_thread(core.next_practice_question, state, body["subject"])
+            return web.json_response({
+                "correct": correct,
+                "answer": question.exercise.answer,
+                "explanation": question.exercise.explanation,
+                "next": practice_dict(following),
+            })
+
+    @routes.get("/progress")
+    async def progress(request):
+        state, lock, *profile = await learners.get(request.query)
+        return web.json_response({"progress": [progress_dict(p) for p in state.progress.values()]})
+
+    app = web.Application(middlewares=[authenticate])
+    app.add_routes(routes)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the learning assistant as a JSON API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args()
+
+    load_dotenv()
+    backend = os.getenv("MODEL_BACKEND", "gemini")
+    api_key = os.getenv("GEMINI_API_KEY")
+    model = create_scheduled_model(backend, api_key) if api_key or backend != "gemini" else None
+    core = LearningCore.from_env(model)
+    app = create_app(core, int(os.getenv("SERVICE_MAX_LEARNERS", "1000")), os.getenv("SERVICE_TOKEN"))
+
+    async def use_worker_threads(app):
+        asyncio.get_running_loop().set_default_executor(
+            ThreadPoolExecutor(max_workers=int(os.getenv("SERVICE_WORKERS", "64")), thread_name_prefix="service")
+        )
+        # The model client is created lazily; create it now, before requests come in,
+        # rather than on the event loop during the first async model call
+        if model is not None:
+            await asyncio.to_thread(model.prepare)
+    app.on_startup.append(use_worker_threads)
+    web.run_app(app, host=args.host, port=args.port, keepalive_timeout=75)
+
+
+if __name__ == "__main__":
+    main()
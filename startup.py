@@ -0,0 +1,51 @@
+# Startup profile of the app. With STARTUP_PROFILE=1 the app logs, once per
+# process, how long each of its imports and initialization steps took the first
+# time they ran:
+#
+#   STARTUP_PROFILE=1 streamlit run app.py
+#
+# benchmarks/bench_startup.py starts the app in a fresh interpreter to see the same
+# steps next to a per-package breakdown of import time.
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+
+class StartupProfile:
+    def __init__(self, enabled):
+        self.enabled = enabled
+        self.steps = {}          # step name -> seconds, the first time it ran
+        self._reported = set()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def step(self, name):
+        if not self.enabled or name in self.steps:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    # Keeps the first time recorded for a step
+    def record(self, name, seconds):
+        if self.enabled:
+            with self._lock:
+                self.steps.setdefault(name, seconds)
+
+    # Log the steps that have not been logged yet
+    def report(self):
+        if not self.enabled:
+            return
+        with self._lock:
+            new = [(name, seconds) for name, seconds in self.steps.items() if name not in self._reported]
+            self._reported.update(name for name, _ in new)
+        for name, seconds in new:
+            print(f"startup: {seconds * 1000:8.1f} ms  {name}", file=sys.stderr, flush=True)
+
+
+startup_profile = StartupProfile(os.getenv("STARTUP_PROFILE") == "1")
@@ -0,0 +1,401 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from metrics import registry
+
+log = logging.getLogger(__name__)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    created TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS profiles (
+    user_id INTEGER PRIMARY KEY REFERENCES users(id),
+    display_name TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS paths (
+    id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id),
+    subject TEXT NOT NULL,
+    overview TEXT NOT NULL,
+    cache_key TEXT,
+    started TEXT NOT NULL,
+    current_module INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (user_id, subject)
+);
+
+CREATE TABLE IF NOT EXISTS modules (
+    path_id INTEGER NOT NULL REFERENCES paths(id),
+    module_id INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    description TEXT NOT NULL,
+    content TEXT,
+    exercises TEXT,
+    additional_resources TEXT NOT NULL,
+    PRIMARY KEY (path_id, module_id)
+);
+
+CREATE TABLE IF NOT EXISTS completions (
+    path_id INTEGER NOT NULL REFERENCES paths(id),
+    module_id INTEGER NOT NULL,
+    completed TEXT NOT NULL,
+    PRIMARY KEY (path_id, module_id)
+);
+
+CREATE TABLE IF NOT EXISTS quiz_scores (
+    id INTEGER PRIMARY KEY,
+    path_id INTEGER NOT NULL REFERENCES paths(id),
+    module_id INTEGER NOT NULL,
+    score REAL NOT NULL,
+    date TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS quiz_scores_path ON quiz_scores (path_id, id);
+
+CREATE TABLE IF NOT EXISTS practice_questions (
+    path_id INTEGER NOT NULL REFERENCES paths(id),
+    question_id INTEGER NOT NULL,
+    module_id INTEGER NOT NULL,
+    exercise TEXT NOT NULL,
+    attempts INTEGER NOT NULL,
+    correct INTEGER NOT NULL,
+    streak INTEGER NOT NULL,
+    due INTEGER NOT NULL,
+    PRIMARY KEY (path_id, question_id)
+);
+"""
+
+# Writes are queued without knowing row ids, so they look paths up by their natural key
+PATH_ID = """(
+    SELECT paths.id FROM paths JOIN users ON users.id = paths.user_id
+    WHERE users.name = ? AND paths.subject = ?
+)"""
+
+
+# SQLite-backed store for learning paths, progress and quiz history. The database runs
+# in WAL mode so sessions can read while a single background thread writes. Writes are
+# queued and committed in batches; reads flush the queue first so they always see them.
+class LearningStore:
+    def __init__(self, db_path, flush_interval=0.5):
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self._local = threading.local()
+        self._pending = []
+        self._writing = False
+        self._flush_requested = False
+        self._condition = threading.Condition()
+
+        connection = self._connection()
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript(SCHEMA)
+
+        self._writer = threading.Thread(target=self._write_loop, name="learning-store-writer", daemon=True)
+        self._writer.start()
+
+    # One connection per thread, since sqlite3 connections must not be shared between threads
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.db_path, timeout=30)
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("PRAGMA foreign_keys=ON")
+            self._local.connection = connection
+        return connection
+
+    def _queue(self, statements):
+        with self._condition:
+            self._pending.extend(statements)
+            self._condition.notify_all()
+
+    def _write_loop(self):
+        connection = self._connection()
+        while True:
+            with self._condition:
+                while not self._pending:
+                    self._condition.wait()
+                # Give closely spaced writes a moment to join the same transaction,
+                # unless a reader is waiting to see them
+                deadline = time.monotonic() + self.flush_interval
+                while not self._flush_requested:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                batch, self._pending = self._pending, []
+                self._flush_requested = False
+                self._writing = True
+
+            try:
+                self._commit(connection, batch)
+            finally:
+                with self._condition:
+                    self._writing = False
+                    self._condition.notify_all()
+
+    # Commit a batch in one transaction. A batch holds the writes of every learner since
+    # the last one, so if it fails, its statements are committed one at a time instead,
+    # and only the ones that fail themselves are dropped.
+    def _commit(self, connection, batch):
+        try:
+            with connection:
+                for sql, params in batch:
+                    connection.execute(sql, params)
+            return
+        except sqlite3.Error as e:
+            if len(batch) == 1:
+                registry.increment("store_write_failures_total")
+                log.warning("dropped a write to the learning store: %s (%s)", e, " ".join(batch[0][0].split()))
+                return
+        for statement in batch:
+            self._commit(connection, [statement])
+
+    # Block until every queued write has been committed
+    def flush(self):
+        with self._condition:
+            if self._pending:
+                self._flush_requested = True
+                self._condition.notify_all()
+            while self._pending or self._writing:
+                self._condition.wait()
+
+    def _read(self, sql, params=()):
+        self.flush()
+        return self._connection().execute(sql, params).fetchall()
+
+    def save_path(self, user_name, subject, learning_path, cache_key, started):
+        now = datetime.now().strftime("%Y-%m-%d %H:%M")
+        # Saving a path again starts it over, like creating it for the first time
+        statements = [
+            ("INSERT OR IGNORE INTO users (name, created) VALUES (?, ?)", (user_name, now)),
+            (
+                """INSERT INTO paths (user_id, subject, overview, cache_key, started, current_module)
+                VALUES ((SELECT id FROM users WHERE name = ?), ?, ?, ?, ?, 0)
+                ON CONFLICT (user_id, subject) DO UPDATE SET
+                    overview = excluded.overview, cache_key = excluded.cache_key,
+                    started = excluded.started, current_module = 0""",
+                (user_name, subject, learning_path["overview"],
+                 json.dumps(cache_key) if cache_key else None, started)
+            ),
+            (f"DELETE FROM modules WHERE path_id = {PATH_ID}", (user_name, subject)),
+            (f"DELETE FROM completions WHERE path_id = {PATH_ID}", (user_name, subject)),
+            (f"DELETE FROM quiz_scores WHERE path_id = {PATH_ID}", (user_name, subject)),
+            (f"DELETE FROM practice_questions WHERE path_id = {PATH_ID}", (user_name, subject)),
+        ]
+        for module in learning_path["modules"]:
+            statements.append((
+                f"""INSERT INTO modules
+                (path_id, module_id, title, description, content, exercises, additional_resources)
+                VALUES ({PATH_ID}, ?, ?, ?, ?, ?, ?)""",
+                (user_name, subject, module["id"], module["title"], module["description"],
+                 module["content"], json.dumps(module["exercises"]), json.dumps(module["additional_resources"]))
+            ))
+        self._queue(statements)
+
+    def update_module(self, user_name, subject, module):
+        self._queue([(
+            f"""UPDATE modules SET content = ?, exercises = ?, additional_resources = ?
+            WHERE path_id = {PATH_ID} AND module_id = ?""",
+            (module["content"], json.dumps(module["exercises"]), json.dumps(module["additional_resources"]),
+             user_name, subject, module["id"])
+        )])
+
+    def complete_module(self, user_name, subject, module_id, current_module):
+        now = datetime.now().strftime("%Y-%m-%d %H:%M")
+        self._queue([
+            (
+                f"INSERT OR IGNORE INTO completions (path_id, module_id, completed) VALUES ({PATH_ID}, ?, ?)",
+                (user_name, subject, module_id, now)
+            ),
+            (
+                f"UPDATE paths SET current_module = ? WHERE id = {PATH_ID}",
+                (current_module, user_name, subject)
+            ),
+        ])
+
+    def add_quiz_score(self, user_name, subject, module_id, score, date):
+        self._queue([(
+            f"INSERT INTO quiz_scores (path_id, module_id, score, date) VALUES ({PATH_ID}, ?, ?, ?)",
+            (user_name, subject, module_id, score, date)
+        )])
+
+    # questions are (question id, module id, exercise dict, attempts, correct, streak, due)
+    def add_practice_questions(self, user_name, subject, questions):
+        self._queue([
+            (
+                f"""INSERT OR REPLACE INTO practice_questions
+                (path_id, question_id, module_id, exercise, attempts, correct, streak, due)
+                VALUES ({PATH_ID}, ?, ?, ?, ?, ?, ?, ?)""",
+                (user_name, subject, question_id, module_id, json.dumps(exercise), attempts, correct, streak, due)
+            )
+            for question_id, module_id, exercise, attempts, correct, streak, due in questions
+        ])
+
+    def update_practice_question(self, user_name, subject, question_id, attempts, correct, streak, due):
+        self._queue([(
+            f"""UPDATE practice_questions SET attempts = ?, correct = ?, streak = ?, due = ?
+            WHERE path_id = {PATH_ID} AND question_id = ?""",
+            (attempts, correct, streak, due, user_name, subject, question_id)
+        )])
+
+    # A user's practice questions on a path with their results, in the order they were added
+    def load_practice_questions(self, user_name, subject):
+        return [
+            (question_id, module_id, json.loads(exercise), attempts, correct, streak, due)
+            for question_id, module_id, exercise, attempts, correct, streak, due in self._read(
+                f"""SELECT question_id, module_id, exercise, attempts, correct, streak, due
+                FROM practice_questions WHERE path_id = {PATH_ID} ORDER BY question_id""",
+                (user_name, subject)
+            )
+        ]
+
+    # The name a user goes by. It is only shown to them; they are stored under user_name.
+    def save_display_name(self, user_name, display_name):
+        now = datetime.now().strftime("%Y-%m-%d %H:%M")
+        self._queue([
+            ("INSERT OR IGNORE INTO users (name, created) VALUES (?, ?)", (user_name, now)),
+            (
+                """INSERT INTO profiles (user_id, display_name) VALUES ((SELECT id FROM users WHERE name = ?), ?)
+                ON CONFLICT (user_id) DO UPDATE SET display_name = excluded.display_name""",
+                (user_name, display_name)
+            ),
+        ])
+
+    def display_name(self, user_name):
+        rows = self._read(
+            """SELECT profiles.display_name FROM profiles JOIN users ON users.id = profiles.user_id
+            WHERE users.name = ?""",
+            (user_name,)
+        )
+        return rows[0][0] if rows else None
+
+    # Subjects and overviews of a user's paths, without loading any module content
+    def list_paths(self, user_name):
+        return self._read(
+            """SELECT paths.subject, paths.overview FROM paths JOIN users ON users.id = paths.user_id
+            WHERE users.name = ? ORDER BY paths.id""",
+            (user_name,)
+        )
+
+    # Load one full path and its cache key, or None if the user has no such path.
+    # Progress on it comes from progress_report.
+    def load_path(self, user_name, subject):
+        rows = self._read(
+            """SELECT paths.id, paths.overview, paths.cache_key
+            FROM paths JOIN users ON users.id = paths.user_id
+            WHERE users.name = ? AND paths.subject = ?""",
+            (user_name, subject)
+        )
+        if not rows:
+            return None
+        path_id, overview, cache_key = rows[0]
+
+        connection = self._connection()
+        modules = [
+            {
+                "id": module_id,
+                "title": title,
+                "description": description,
+                "content": content,
+                "exercises": json.loads(exercises) if exercises else None,
+                "additional_resources": json.loads(resources),
+            }
+            for module_id, title, description, content, exercises, resources in connection.execute(
+                """SELECT module_id, title, description, content, exercises, additional_resources
+                FROM modules WHERE path_id = ? ORDER BY module_id""",
+                (path_id,)
+            )
+        ]
+        learning_path = {"subject": subject, "overview": overview, "modules": modules}
+        return learning_path, tuple(json.loads(cache_key)) if cache_key else None
+
+    # Progress for every path of a user, answered from the indexes rather than the module content
+    def progress_report(self, user_name):
+        report = {}
+        for path_id, subject, started, current_module, total_modules in self._read(
+            """SELECT paths.id, paths.subject, paths.started, paths.current_module,
+                (SELECT COUNT(*) FROM modules WHERE modules.path_id = paths.id)
+            FROM paths JOIN users ON users.id = paths.user_id
+            WHERE users.name = ? ORDER BY paths.id""",
+            (user_name,)
+        ):
+            report[path_id] = {
+                "subject": subject,
+                "started": started,
+                "current_module": current_module,
+                "total_modules": total_modules,
+                "completed": [],
+                "quiz_scores": [],
+            }
+
+        connection = self._connection()
+        for path_id, module_id, title in connection.execute(
+            """SELECT completions.path_id, modules.module_id, modules.title
+            FROM completions
+            JOIN paths ON paths.id = completions.path_id
+            JOIN users ON users.id = paths.user_id
+            JOIN modules ON modules.path_id = completions.path_id AND modules.module_id = completions.module_id
+            WHERE users.name = ? ORDER BY completions.path_id, completions.module_id""",
+            (user_name,)
+        ):
+            report[path_id]["completed"].append((module_id, title))
+
+        for path_id, module_id, title, score, date in connection.execute(
+            """SELECT quiz_scores.path_id, quiz_scores.module_id, modules.title, quiz_scores.score, quiz_scores.date
+            FROM quiz_scores
+            JOIN paths ON paths.id = quiz_scores.path_id
+            JOIN users ON users.id = paths.user_id
+            JOIN modules ON modules.path_id = quiz_scores.path_id AND modules.module_id = quiz_scores.module_id
+            WHERE users.name = ? ORDER BY quiz_scores.path_id, quiz_scores.id""",
+            (user_name,)
+        ):
+            report[path_id]["quiz_scores"].append((module_id, title, score, date))
+
+        return list(report.values())
+
+
+# Stands in for the store for learners who are kept in memory only: nothing they do
+# is written, so there is never anything to read back
+class UnsavedStore:
+    def save_path(self, user_name, subject, learning_path, cache_key, started):
+        pass
+
+    def update_module(self, user_name, subject, module):
+        pass
+
+    def complete_module(self, user_name, subject, module_id, current_module):
+        pass
+
+    def add_quiz_score(self, user_name, subject, module_id, score, date):
+        pass
+
+    def add_practice_questions(self, user_name, subject, questions):
+        pass
+
+    def update_practice_question(self, user_name, subject, question_id, attempts, correct, streak, due):
+        pass
+
+    def load_practice_questions(self, user_name, subject):
+        return []
+
+    def list_paths(self, user_name):
+        return []
+
+    def load_path(self, user_name, subject):
+        return None
+
+    def progress_report(self, user_name):
+        return []
@@ -0,0 +1,52 @@
+import random
+
+from answer_cache import AnswerCache, shingles
+
+WORDS = [f"term{i}" for i in range(200)]
+
+
+def similarity(a, b):
+    a, b = shingles(a), shingles(b)
+    return len(a & b) / len(a | b)
+
+
+# Long questions and the same questions with two neighbouring words swapped
+def reordered_pairs(count, seed=0):
+    rng = random.Random(seed)
+    pairs = []
+    for _ in range(count):
+        words = rng.sample(WORDS, 24)
+        reordered = list(words)
+        i = rng.randrange(len(words) - 1)
+        reordered[i], reordered[i + 1] = reordered[i + 1], reordered[i]
+        pairs.append((" ".join(words), " ".join(reordered)))
+    return pairs
+
+
+def test_finds_questions_above_the_threshold():
+    pairs = [pair for pair in reordered_pairs(500) if similarity(*pair) >= 0.85]
+    assert len(pairs) > 400
+    cache = AnswerCache(threshold=0.85)
+    found = 0
+    for i, (question, reordered) in enumerate(pairs):
+        scope = ("Rust", i)
+        cache.put(scope, question, "answer")
+        found += cache.get(scope, reordered) == "answer"
+    assert found / len(pairs) >= 0.98
+
+
+def test_answers_the_same_question_worded_differently():
+    cache = AnswerCache()
+    cache.put(("Python", 1), "What is the difference between a list and a tuple?", "answer")
+    assert cache.get(("Python", 1), "what's the difference between lists and tuples") == "answer"
+    assert cache.get(("Python", 1), "What is the difference between a list and tuple?") == "answer"
+
+
+def test_does_not_answer_a_question_about_something_else():
+    cache = AnswerCache()
+    cache.put(("Python", 1), "What is the difference between a list and a set?", "list vs set")
+    cache.put(("Python", 1), "How do I sort a list in reverse order?", "reverse sort")
+    assert cache.get(("Python", 1), "What is the difference between a list and a tuple?") is None
+    assert cache.get(("Python", 1), "How do I sort a list?") is None
+    assert cache.get(("Python", 1), "Why do I sort a list in reverse order?") is None
+    assert cache.get(("Python", 2), "How do I sort a list in reverse order?") is None
@@ -0,0 +1,97 @@
+import copy
+
+from backends import FakeModel
+from catalog import ContentCatalog
+from answer_cache import AnswerCache
+from core import LearnerState, LearningCore
+from path_cache import PathCache, normalize_path_key
+from prefetch import ModulePrefetcher
+from storage import LearningStore
+
+
+def make_core(tmp_path):
+    return LearningCore(
+        FakeModel(),
+        store=LearningStore(str(tmp_path / "learning.db")),
+        path_cache=PathCache(str(tmp_path / "learning_paths.json")),
+        catalog=ContentCatalog(str(tmp_path / "catalog")),
+        answer_cache=AnswerCache(),
+        prefetcher=ModulePrefetcher()
+    )
+
+
+def test_module_content_is_not_shared_into_a_different_outline(tmp_path):
+    core = make_core(tmp_path)
+    ada = LearnerState("ada")
+    core.load_learner(ada)
+    core.create_learning_path_outline(ada, "Go")
+    outline_key = normalize_path_key("Go", "Beginner", "Visual") + ("outline",)
+
+    # The cached outline was evicted and another learner generated a different one
+    regenerated = copy.deepcopy(core.path_cache.get(outline_key))
+    regenerated["modules"][1]["title"] = "Something else entirely"
+    core.path_cache.put(outline_key, regenerated)
+    bob = LearnerState("bob")
+    core.load_learner(bob)
+    core.create_learning_path_outline(bob, "Go")
+
+    ada_module = core.load_learning_path(ada, "Go").module(2)
+    core.load_module(ada, "Go", ada_module)
+    assert ada_module.content
+    assert core.path_cache.get(outline_key)["modules"][1]["content"] is None
+
+    # Bob's module 2 is generated for his own outline, not handed Ada's
+    bob_module = core.load_learning_path(bob, "Go").module(2)
+    assert bob_module.title == "Something else entirely"
+    core.load_module(bob, "Go", bob_module)
+    assert core.path_cache.get(outline_key)["modules"][1]["content"] == bob_module.content
+
+
+class RecordingModel(FakeModel):
+    def __init__(self):
+        super().__init__()
+        self.prompts = []
+
+    def generate_content(self, prompt, *args, **kwargs):
+        self.prompts.append(prompt)
+        return super().generate_content(prompt, *args, **kwargs)
+
+
+def test_cached_explanations_are_not_written_for_one_learner(tmp_path):
+    core = make_core(tmp_path)
+    core.model = RecordingModel()
+    ada, bob = LearnerState("Ada"), LearnerState("Bob")
+    for state in (ada, bob):
+        core.load_learner(state)
+        core.create_learning_path(state, "Go")
+
+    module = core.load_learning_path(ada, "Go").module(1)
+    answer = "".join(core.get_ai_explanation(ada, "What is a goroutine?", "Go", module))
+    assert "Ada" not in core.model.prompts[-1]
+
+    # Bob is served the same answer without another call
+    calls = len(core.model.prompts)
+    module = core.load_learning_path(bob, "Go").module(1)
+    assert "".join(core.get_ai_explanation(bob, "What is a goroutine?", "Go", module)) == answer
+    assert len(core.model.prompts) == calls
+
+
+def test_unsaved_learners_are_kept_in_memory_until_they_are_saved(tmp_path):
+    core = make_core(tmp_path)
+    ada = LearnerState("Ada")
+    ada.learner_id = None
+    core.load_learner(ada)
+    core.create_learning_path(ada, "Go")
+    core.complete_module(ada, "Go", 1)
+    core.add_quiz_score(ada, "Go", 1, 80.0, "2025-01-02")
+    assert core.store.list_paths("Ada") == []
+
+    core.start_saving(ada, "ada-id")
+    core.add_quiz_score(ada, "Go", 2, 60.0, "2025-01-03")
+    again = LearnerState("Ada")
+    again.learner_id = "ada-id"
+    core.load_learner(again)
+    progress = again.progress["Go"]
+    assert list(progress.completed) == [1]
+    assert progress.quiz_scores == [(1, 80.0, "2025-01-02"), (2, 60.0, "2025-01-03")]
+    assert core.load_learning_path(again, "Go").to_dict()["modules"] == core.load_learning_path(ada, "Go").to_dict()["modules"]
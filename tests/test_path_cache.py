@@ -0,0 +1,31 @@
+from backends import fake_learning_path
+from path_cache import PathCache
+
+
+def test_entries_are_saved_in_the_background(tmp_path):
+    file_path = str(tmp_path / "learning_paths.json")
+    cache = PathCache(file_path, max_entries=3, save_interval=60)
+    for subject in ("Go", "Rust", "Zig", "Elm"):
+        cache.put((subject.lower(), "beginner", "visual"), fake_learning_path(subject, 2))
+    cache.flush()
+
+    reloaded = PathCache(file_path)
+    assert len(reloaded) == 3
+    assert reloaded.get(("go", "beginner", "visual")) is None
+    assert reloaded.get(("elm", "beginner", "visual"))["subject"] == "Elm"
+
+
+def test_update_module_fills_in_only_the_same_module(tmp_path):
+    cache = PathCache(str(tmp_path / "learning_paths.json"))
+    key = ("go", "beginner", "visual", "outline")
+    cache.put(key, fake_learning_path("Go", 3, outline=True))
+    module = cache.get(key)["modules"][1]
+    details = {"content": "Goroutines", "exercises": [], "resources": []}
+
+    assert not cache.update_module(key, 2, "Another title", module["description"], details)
+    assert not cache.update_module(key, 4, module["title"], module["description"], details)
+    assert cache.update_module(key, 2, module["title"], module["description"], details)
+
+    modules = cache.get(key)["modules"]
+    assert modules[1]["content"] == "Goroutines"
+    assert "content" not in modules[0] and "content" not in modules[2]
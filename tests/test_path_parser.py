@@ -0,0 +1,36 @@
+import json
+
+from backends import fake_learning_path
+from path_parser import extract_json, parse_learning_path
+
+SAMPLE = "Try it:\n```python\nfor item in [1, 2]:\n    print(item)\n```\nThat prints each item."
+
+
+def path_with_code_samples():
+    learning_path = fake_learning_path("Python", 3)
+    for module in learning_path["modules"]:
+        module["content"] += "\n\n" + SAMPLE
+    return learning_path
+
+
+def test_fenced_response_with_code_samples_in_the_content():
+    learning_path = path_with_code_samples()
+    content = "Here is your path:\n```json\n" + json.dumps(learning_path, indent=2) + "\n```\nEnjoy!"
+    parsed, complete = parse_learning_path(content)
+    assert complete
+    assert [m["content"] for m in parsed["modules"]] == [m["content"] for m in learning_path["modules"]]
+
+
+def test_cut_off_fenced_response_keeps_its_complete_modules():
+    payload = json.dumps(path_with_code_samples(), indent=2)
+    # Cut inside the last module, after its code sample
+    content = "```json\n" + payload[:payload.rindex("That prints")]
+    parsed, complete = parse_learning_path(content)
+    assert not complete
+    assert [m["id"] for m in parsed["modules"]] == [1, 2]
+
+
+def test_extract_json_takes_off_only_the_outer_fence():
+    assert extract_json('```\n{"a": "```x```"}\n```') == '{"a": "```x```"}'
+    assert extract_json('```json{"a": 1}```') == '{"a": 1}'
+    assert extract_json('{"a": 1}') == '{"a": 1}'
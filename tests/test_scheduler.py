@@ -0,0 +1,156 @@
+import asyncio
+import threading
+import time
+
+from scheduler import BACKGROUND, INTERACTIVE, ModelScheduler
+
+
+class Response:
+    text = "ok"
+    usage_metadata = None
+
+
+class SlowModel:
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.calls = 0
+
+    def generate_content(self, prompt, *args, **kwargs):
+        self.calls += 1
+        time.sleep(self.delay)
+        return Response()
+
+    async def generate_content_async(self, prompt, *args, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return Response()
+
+
+def wait_for_stats(scheduler, expected, timeout=2):
+    deadline = time.monotonic() + timeout
+    while scheduler.stats() != expected and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return scheduler.stats()
+
+
+def wait_until_idle(scheduler, timeout=2):
+    return wait_for_stats(scheduler, {"active": 0, "waiting": 0}, timeout)
+
+
+def test_async_call_cancelled_while_waiting_leaves_the_queue():
+    scheduler = ModelScheduler(SlowModel(), max_concurrency=1, reserved_interactive=0)
+    scheduler._acquire(INTERACTIVE, 1)
+
+    async def run():
+        waiting = asyncio.create_task(scheduler.generate_content_async("late", caller="t"))
+        while scheduler.stats()["waiting"] == 0:
+            await asyncio.sleep(0.001)
+        waiting.cancel()
+        try:
+            await waiting
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(run())
+    assert wait_for_stats(scheduler, {"active": 1, "waiting": 0}) == {"active": 1, "waiting": 0}
+    scheduler._release()
+    assert scheduler.stats() == {"active": 0, "waiting": 0}
+
+
+def test_async_call_cancelled_just_after_getting_a_slot_gives_it_back():
+    scheduler = ModelScheduler(SlowModel(), max_concurrency=1, reserved_interactive=0)
+
+    async def run():
+        call = asyncio.create_task(scheduler.generate_content_async("x", caller="t"))
+        await asyncio.sleep(0)
+        # Block the loop until the thread has taken the slot, so the call is cancelled
+        # before it hears that it got one
+        while scheduler.stats()["active"] == 0:
+            time.sleep(0.001)
+        call.cancel()
+        try:
+            await call
+        except asyncio.CancelledError:
+            pass
+        return call.cancelled()
+
+    assert asyncio.run(run())
+    assert scheduler.stats() == {"active": 0, "waiting": 0}
+
+
+def test_cancelled_async_calls_do_not_starve_later_ones():
+    scheduler = ModelScheduler(SlowModel(0.05), max_concurrency=2, reserved_interactive=0)
+
+    async def run():
+        for _ in range(5):
+            try:
+                await asyncio.wait_for(scheduler.generate_content_async("x", caller="t"), 0.01)
+            except asyncio.TimeoutError:
+                pass
+        return await asyncio.wait_for(scheduler.generate_content_async("x", caller="t"), 2)
+
+    assert asyncio.run(run()).text == "ok"
+    assert wait_until_idle(scheduler) == {"active": 0, "waiting": 0}
+
+
+def test_concurrency_is_capped():
+    model = SlowModel(0.05)
+    scheduler = ModelScheduler(model, max_concurrency=2, reserved_interactive=0)
+    peak = []
+
+    def call():
+        scheduler.generate_content("x", caller="t")
+
+    def watch(stop):
+        while not stop.is_set():
+            peak.append(scheduler.stats()["active"])
+            time.sleep(0.005)
+
+    stop = threading.Event()
+    watcher = threading.Thread(target=watch, args=(stop,))
+    watcher.start()
+    threads = [threading.Thread(target=call) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stop.set()
+    watcher.join()
+    assert model.calls == 6
+    assert max(peak) <= 2
+
+
+def test_interactive_calls_go_first():
+    scheduler = ModelScheduler(SlowModel(0.05), max_concurrency=1, reserved_interactive=0)
+    order = []
+
+    def call(name, priority):
+        scheduler.generate_content(name, caller=name, priority=priority)
+        order.append(name)
+
+    first = threading.Thread(target=call, args=("first", BACKGROUND))
+    first.start()
+    time.sleep(0.02)
+    threads = [threading.Thread(target=call, args=("background", BACKGROUND))]
+    threads[0].start()
+    time.sleep(0.01)
+    threads.append(threading.Thread(target=call, args=("interactive", INTERACTIVE)))
+    threads[1].start()
+    for thread in [first] + threads:
+        thread.join()
+    assert order == ["first", "interactive", "background"]
+
+
+def test_transient_errors_are_retried():
+    class FlakyModel(SlowModel):
+        def generate_content(self, prompt, *args, **kwargs):
+            self.calls += 1
+            if self.calls < 3:
+                raise ConnectionError("reset")
+            return Response()
+
+    model = FlakyModel()
+    scheduler = ModelScheduler(model, max_retries=4, base_delay=0.001)
+    assert scheduler.generate_content("x", caller="t").text == "ok"
+    assert model.calls == 3
+    assert scheduler.stats()["active"] == 0
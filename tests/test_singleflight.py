@@ -0,0 +1,65 @@
+import threading
+import time
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_result():
+    flights = SingleFlight()
+    calls = []
+    results = []
+
+    def work():
+        calls.append(1)
+        time.sleep(0.1)
+        return "path"
+
+    def ask():
+        results.append(flights.do("key", work))
+
+    threads = [threading.Thread(target=ask) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+    assert {result for result, _ in results} == {"path"}
+    assert flights.in_flight() == 0
+
+
+def test_waiters_get_the_leaders_error():
+    flights = SingleFlight()
+    started = threading.Event()
+    errors = []
+
+    def work():
+        started.set()
+        time.sleep(0.1)
+        raise ValueError("broken")
+
+    def ask():
+        try:
+            flights.do("key", work)
+        except ValueError as e:
+            errors.append(e)
+
+    leader = threading.Thread(target=ask)
+    leader.start()
+    started.wait()
+    follower = threading.Thread(target=ask)
+    follower.start()
+    leader.join()
+    follower.join()
+    assert len(errors) == 2 and errors[0] is errors[1]
+
+
+def test_key_is_run_again_after_the_flight_ends():
+    flights = SingleFlight()
+    assert flights.do("key", lambda: 1) == (1, False)
+    assert flights.do("key", lambda: 2) == (2, False)
+    with pytest.raises(KeyError):
+        flights.do("key", lambda: {}["missing"])
+    assert flights.in_flight() == 0
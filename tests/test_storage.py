@@ -0,0 +1,33 @@
+from backends import fake_learning_path
+from metrics import registry
+from storage import LearningStore
+
+
+def failures():
+    return sum(count for name, _, count in registry.summary()[1] if name == "store_write_failures_total")
+
+
+def test_a_bad_write_does_not_lose_the_rest_of_its_batch(tmp_path):
+    store = LearningStore(str(tmp_path / "learning.db"), flush_interval=0.2)
+    before = failures()
+    store.save_path("ada", "Rust", fake_learning_path("Rust", 3), None, "2025-01-01")
+    # Violates NOT NULL on quiz_scores.score, in the same batch as the other writes
+    store.add_quiz_score("ada", "Rust", 1, None, "2025-01-02")
+    store.save_path("bob", "Go", fake_learning_path("Go", 2), None, "2025-01-01")
+    store.add_quiz_score("bob", "Go", 1, 50.0, "2025-01-02")
+    store.flush()
+
+    assert dict(store.list_paths("ada")) == {"Rust": "A 3 module introduction to Rust."}
+    assert store.progress_report("bob")[0]["quiz_scores"] == [(1, "Go part 1", 50.0, "2025-01-02")]
+    assert store.progress_report("ada")[0]["quiz_scores"] == []
+    assert failures() == before + 1
+
+
+def test_display_names_are_kept_apart_from_learner_ids(tmp_path):
+    store = LearningStore(str(tmp_path / "learning.db"))
+    store.save_path("ada-id", "Go", fake_learning_path("Go", 2), None, "2025-01-01")
+    store.save_display_name("ada-id", "Ada")
+    store.save_display_name("ada-id", "Ada L.")
+    assert store.display_name("ada-id") == "Ada L."
+    assert store.display_name("Ada L.") is None
+    assert store.list_paths("Ada L.") == []